@@ -0,0 +1,117 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import argparse
+from dataclasses import replace
+from pathlib import Path
+
+from vision_rag_summarizer.modules import rag_store
+from vision_rag_summarizer.pipeline import PIPELINE_MODELS, PipelineConfig, process_document
+
+def read_inputs(source) -> list:
+    """
+    PDFs to process: every *.pdf under a directory, or the entries of a
+    manifest file (a JSON list of paths, or one path per line; '#' comments
+    and relative paths are resolved against the manifest's folder).
+    """
+    source = Path(source)
+    if source.is_dir():
+        return sorted(source.rglob("*.pdf"))
+    text = source.read_text(encoding="utf-8")
+    if source.suffix == ".json":
+        paths = json.loads(text)
+    else:
+        lines = (line.strip() for line in text.splitlines())
+        paths = [line for line in lines if line and not line.startswith("#")]
+    return [source.parent / path for path in paths]  # an absolute path replaces the folder
+
+def _work_dirs(pdfs, output_dir) -> list:
+    # One folder per document, named by its stem; a taken name gets the first
+    # free suffix, which also avoids stems that already end in one (a, a, a_1)
+    used = set()
+    dirs = []
+    for pdf in pdfs:
+        name, n = pdf.stem, 0
+        while name in used:
+            n += 1
+            name = f"{pdf.stem}_{n}"
+        used.add(name)
+        dirs.append(Path(output_dir) / name)
+    return dirs
+
+async def process_batch(pdfs, models, output_dir="batch_output", max_docs=4, config=None, cache=None):
+    """
+    Runs many documents through process_document with the same models.
+
+    Up to max_docs documents are in flight at once; their pages meet in the
+    registry's shared caption and LLM queues, so batches fill across document
+    boundaries. Outputs stay per document (output_dir/<stem>/). A failed
+    document is recorded and the rest continue.
+
+    Returns one result dict per input, also written to output_dir/results.json.
+    """
+    config = config or PipelineConfig()
+    # Documents in flight share the cores; don't give each one a full OCR,
+    # narration or encode pool, nor x264 threads sized for the whole machine
+    config = replace(
+        config,
+        extract_workers=max(1, config.extract_workers // max_docs),
+        narrate_workers=max(1, config.narrate_workers // max_docs),
+        encode_threads=config.encode_threads
+        or max(1, (os.cpu_count() or 1) // (config.encode_workers * max_docs)),
+    )
+    slots = asyncio.Semaphore(max_docs)
+    results = []
+
+    async def run(pdf, work_dir):
+        async with slots:
+            result = {"pdf_path": str(pdf), "output_dir": str(work_dir)}
+            start = time.time()
+            try:
+                summary_file, video_path = await process_document(
+                    pdf, models, work_dir=work_dir, config=config, cache=cache
+                )
+                result.update(status="done", summary_path=str(summary_file), video_path=str(video_path))
+            except Exception as e:
+                logging.error(f"❌ {pdf} failed: {e}")
+                result.update(status="failed", error=str(e))
+            result["seconds"] = round(time.time() - start, 1)
+            results.append(result)
+            logging.info(f"📄 [{len(results)}/{len(pdfs)}] {pdf}: {result['status']} in {result['seconds']}s")
+            return result
+
+    ordered = await asyncio.gather(*(run(pdf, d) for pdf, d in zip(pdfs, _work_dirs(pdfs, output_dir))))
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(Path(output_dir) / "results.json", "w", encoding="utf-8") as f:
+        json.dump(ordered, f, indent=2)
+    return ordered
+
+async def main(source, output_dir, max_docs, rag_backend="chroma"):
+    from vision_rag_summarizer.main import setup
+
+    start = time.time()
+    pdfs = read_inputs(source)
+    logging.info(f"📚 {len(pdfs)} documents from {source}")
+    cache, models = setup(rag_backend)
+    models.prewarm(*PIPELINE_MODELS)
+    try:
+        results = await process_batch(pdfs, models, output_dir, max_docs, cache=cache)
+    finally:
+        models.close()
+
+    failed = sum(r["status"] == "failed" for r in results)
+    cache.log_stats()
+    logging.info(f"🎉 {len(results) - failed} done, {failed} failed in {time.time() - start:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize and narrate many PDFs with one set of models")
+    parser.add_argument("source", help="directory of PDFs, or a manifest (.json list or one path per line)")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--max-docs", type=int, default=4, help="documents processed at once")
+    parser.add_argument("--rag-backend", choices=rag_store.BACKENDS, default="chroma",
+                        help="vector store for page retrieval (numpy: flat in-process index)")
+    args = parser.parse_args()
+    asyncio.run(main(args.source, args.output_dir, args.max_docs, args.rag_backend))
@@ -1,51 +1,122 @@
 from transformers import BlipProcessor, BlipForConditionalGeneration
-from PIL import Image, ImageStat
 import torch
 from pathlib import Path
 import logging
-import platform
+
+from vision_rag_summarizer.modules.page import prepare_image
+from vision_rag_summarizer.modules.result_cache import make_key, content_digest
+from vision_rag_summarizer.modules.quantization import check_mode, load_quantized
+from vision_rag_summarizer.modules.model_registry import detect_device
+from vision_rag_summarizer.utils.batch_queue import BatchQueue
+from vision_rag_summarizer.utils.stopping import cancel_criteria, was_cancelled
 
 class BlipWrapper:
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, cache=None, quantize: str = None):
+        # quantize: None, "int8" (dynamic int8 Linear layers, CPU only) or "bf16";
+        # int8 weights are saved under .cache/quantized and reused
         model_path = Path(model_path)
+        self.model_id = str(model_path.resolve())
+        self.cache = cache  # optional ResultCache for captions
         if not model_path.is_dir():
             raise FileNotFoundError(f"Model directory not found: {model_path.resolve()}")
 
-        system = platform.system()
-        if torch.cuda.is_available():
-            self.device = torch.device("cuda")
-        elif system == "Darwin" and platform.mac_ver()[0] >= "14.0":
-            self.device = torch.device("mps")
-        else:
-            self.device = torch.device("cpu")
+        self.device = detect_device()
 
         logging.info(f"🧠 BLIP running on device: {self.device}")
 
+        self.quantize = check_mode(quantize, self.device)
+        if self.quantize:
+            self.model_id += f"+{self.quantize}"
+        self.dtype = torch.bfloat16 if self.quantize == "bf16" else torch.float32
+
         self.processor = BlipProcessor.from_pretrained(model_path, local_files_only=True)
-        self.model = BlipForConditionalGeneration.from_pretrained(model_path, local_files_only=True).to(self.device)
+        self.model = load_quantized(
+            model_path, self.quantize,
+            # low_cpu_mem_usage memory-maps safetensors instead of initializing then copying weights
+            lambda: BlipForConditionalGeneration.from_pretrained(
+                model_path, local_files_only=True, low_cpu_mem_usage=True
+            ),
+            model_cls=BlipForConditionalGeneration
+        ).to(self.device)
         self.model.eval()
 
         logging.info("✅ BLIP model and processor loaded")
 
-    def run(self, image_path: str, prompt: str = None) -> str:
-        try:
-            image = Image.open(image_path).convert("RGB")
+    def run(self, image_path, prompt: str = None, cancel_token=None) -> str:
+        # image_path may be a file path, an in-memory Page or a PIL image
+        return self.run_batch([image_path], prompt=prompt, batch_size=1, cancel_tokens=[cancel_token])[0]
+
+    def run_batch(self, image_paths, prompt: str = None, batch_size: int = 8, cancel_tokens=None) -> list:
+        """
+        Captions many images with one generate call per batch of batch_size.
+
+        Blank images and cache hits are resolved per item and never reach the
+        model; captions come back in the same order as image_paths. A cancelled
+        entry of cancel_tokens stops that caption early (and it isn't cached).
+        """
+        cancel_tokens = cancel_tokens or [None] * len(image_paths)
+        captions = [None] * len(image_paths)
+        todo = []  # (index, image, cache key), flushed every batch_size items
+
+        def flush():
+            try:
+                # The processor resizes every image to the model's input size, so
+                # the batch stacks without padding
+                inputs = self.processor(images=[image for _, image, _ in todo], return_tensors="pt").to(self.device)
+                inputs["pixel_values"] = inputs["pixel_values"].to(self.dtype)
+                with torch.no_grad():
+                    gen_ids = self.model.generate(
+                        **inputs, max_new_tokens=64,
+                        stopping_criteria=cancel_criteria([cancel_tokens[i] for i, _, _ in todo])
+                    )
+                decoded = self.processor.batch_decode(gen_ids, skip_special_tokens=True)
+            except Exception as e:
+                logging.error(f"❌ BLIP failed for batch of {len(todo)} images: {e}")
+                decoded = ["[Error]"] * len(todo)
+
+            for (i, _, key), caption in zip(todo, decoded):
+                captions[i] = caption
+                if key is not None and caption != "[Error]" and not was_cancelled(cancel_tokens[i]):
+                    self.cache.put(key, caption)
+            todo.clear()
+
+        for i, image_path in enumerate(image_paths):
+            try:
+                image = prepare_image(image_path)
+                if image is None:
+                    captions[i] = "[Skipped blank image]"
+                    continue
+
+                key = None
+                if self.cache is not None:
+                    key = make_key("blip", self.model_id, prompt, 64, content_digest(image))
+                    cached = self.cache.get(key)
+                    if cached is not None:
+                        captions[i] = cached
+                        continue
+                todo.append((i, image, key))
+            except Exception as e:
+                logging.error(f"❌ BLIP failed for {image_path}: {e}")
+                captions[i] = "[Error]"
+
+            if len(todo) >= batch_size:
+                flush()
 
-            # Resize
-            max_size = (768, 768)
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
+        if todo:
+            flush()
 
-            # Skip blank images
-            stat = ImageStat.Stat(image)
-            if sum(stat.mean) / len(stat.mean) > 250:
-                logging.warning(f"⚠️ Skipping blank image: {image_path}")
-                return "[Skipped blank image]"
+        return captions
 
-            inputs = self.processor(images=image, return_tensors="pt").to(self.device)
-            with torch.no_grad():
-                gen_ids = self.model.generate(**inputs, max_new_tokens=64)
-            return self.processor.decode(gen_ids[0], skip_special_tokens=True)
+    def batcher(self, max_batch_size: int = 8, max_wait: float = 0.05) -> BatchQueue:
+        """
+        Request queue in front of run_batch: submit(image) returns a Future.
 
-        except Exception as e:
-            logging.error(f"❌ BLIP failed for {image_path}: {e}")
-            return "[Error]"
+        Images submitted from different documents within max_wait of each other
+        are captioned in the same generate call.
+        """
+        return BatchQueue(
+            lambda images, cancel_tokens=None: self.run_batch(
+                images, batch_size=max_batch_size, cancel_tokens=cancel_tokens
+            ),
+            max_batch_size=max_batch_size, max_wait=max_wait, cancellable=True, name="blip-batcher"
+        )
@@ -0,0 +1,272 @@
+import os
+import queue
+import logging
+import itertools
+import threading
+import multiprocessing as mp
+import multiprocessing.connection
+from pathlib import Path
+from concurrent.futures import Future
+
+from vision_rag_summarizer.utils.time_out import CancellationToken
+
+def available_cores() -> list:
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:  # not Linux
+        return list(range(os.cpu_count() or 1))
+
+def partition_cores(cores, replicas) -> list:
+    """Splits cores into `replicas` disjoint, contiguous sets of near-equal size."""
+    replicas = max(1, min(replicas, len(cores)))
+    size, extra = divmod(len(cores), replicas)
+    sets, start = [], 0
+    for i in range(replicas):
+        end = start + size + (1 if i < extra else 0)
+        sets.append(cores[start:end])
+        start = end
+    return sets
+
+def _pin(cores):
+    # torch is usually imported already (spawn re-imports the main module),
+    # so OMP_NUM_THREADS would be read too late; size the pools through torch.
+    # Its worker threads start on first use and inherit the affinity.
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    import torch
+    torch.set_num_threads(len(cores))
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:  # inter-op pool already started
+        pass
+
+def _replica_main(index, cores, model_path, options, requests, cancels, results, max_batch_size, max_wait):
+    _pin(cores)
+    from vision_rag_summarizer.modules.text_llm_wrapper import TextLlmWrapper
+
+    try:
+        # The parent owns the result cache; replicas only generate
+        llm = TextLlmWrapper(model_path, **options)
+    except Exception as e:
+        results.put(("failed", index, None, str(e)))
+        return
+    results.put(("ready", index, None, None))
+
+    tokens = {}
+    early = set()  # cancelled before this replica picked the request up
+    lock = threading.Lock()
+
+    def listen():
+        while (request_id := cancels.get()) is not None:
+            with lock:
+                if request_id in tokens:
+                    tokens[request_id].cancel()
+                else:
+                    early.add(request_id)
+
+    threading.Thread(target=listen, daemon=True).start()
+
+    while True:
+        first = requests.get()
+        if first is None:
+            break
+        batch = [first]
+        while len(batch) < max_batch_size:
+            try:
+                nxt = requests.get(timeout=max_wait)
+            except queue.Empty:
+                break
+            if nxt is None:
+                requests.put(None)
+                break
+            batch.append(nxt)
+
+        with lock:
+            for request_id, _ in batch:
+                tokens[request_id] = CancellationToken()
+                if request_id in early:
+                    early.discard(request_id)
+                    tokens[request_id].cancel()
+        try:
+            outputs = llm.run_batch([item for _, item in batch],
+                                    cancel_tokens=[tokens[request_id] for request_id, _ in batch])
+            for (request_id, _), output in zip(batch, outputs):
+                results.put(("result", index, request_id, output))
+        except Exception as e:
+            for request_id, _ in batch:
+                results.put(("error", index, request_id, str(e)))
+        with lock:
+            for request_id, _ in batch:
+                tokens.pop(request_id, None)
+
+    cancels.put(None)
+
+class _RemoteCancel:
+    """Future.cancel_token that stops a request inside its replica process."""
+    def __init__(self, cancels, request_id):
+        self._cancels = cancels
+        self._request_id = request_id
+        self.cancelled = False
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            self._cancels.put(self._request_id)
+
+class LlmPool:
+    """
+    N TextLlmWrapper replicas in separate processes, each pinned to its own
+    disjoint set of cores with torch.set_num_threads sized to match, so
+    replicas don't fight over the same cores the way threads sharing one
+    model do.
+
+    submit(prompt or (prompt, prefix)) returns a Future like
+    TextLlmWrapper.batcher(), so the pool can stand in for the LLM queue.
+    Each request goes to the replica with the fewest requests in flight;
+    a replica batches whatever is waiting for it (up to max_batch_size).
+    With a cache (ResultCache), lookups and stores happen here in the parent
+    under the same keys TextLlmWrapper uses, so cached summaries never
+    reach a replica and no two processes write one SQLite file.
+    """
+    def __init__(self, model_path, replicas=None, cores_per_replica=8, cache=None,
+                 max_batch_size=8, max_wait=0.05, **wrapper_options):
+        self.cache = cache
+        self._model_id = None
+        if cache is not None:
+            from vision_rag_summarizer.modules.model_registry import detect_device
+            from vision_rag_summarizer.modules.quantization import check_mode
+            quantize = check_mode(wrapper_options.get("quantize"), detect_device())
+            # Same id as TextLlmWrapper.model_id, so entries are shared with unpooled runs
+            self._model_id = str(Path(model_path).resolve()) + (f"+{quantize}" if quantize else "")
+        cores = available_cores()
+        replicas = replicas or max(1, len(cores) // cores_per_replica)
+        self.core_sets = partition_cores(cores, replicas)
+        ctx = mp.get_context("spawn")  # fork after torch has threads is unsafe
+
+        self._results = ctx.Queue()
+        self._requests = [ctx.Queue() for _ in self.core_sets]
+        self._cancels = [ctx.Queue() for _ in self.core_sets]
+        self._inflight = [0] * len(self.core_sets)
+        self._futures = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._closed = False
+        self._ready = threading.Event()
+        self._reported = set()  # replicas that finished loading, failed or exited
+
+        self._processes = [
+            ctx.Process(
+                target=_replica_main, name=f"llm-replica-{i}", daemon=True,
+                args=(i, cores, model_path, wrapper_options, self._requests[i],
+                      self._cancels[i], self._results, max_batch_size, max_wait)
+            )
+            for i, cores in enumerate(self.core_sets)
+        ]
+        for process in self._processes:
+            process.start()
+        self._collector = threading.Thread(target=self._collect, name="llm-pool-results", daemon=True)
+        self._collector.start()
+        threading.Thread(target=self._watch, name="llm-pool-watch", daemon=True).start()
+        logging.info(f"🧩 LLM pool: {len(self.core_sets)} replicas on "
+                     f"{', '.join(f'{len(c)} cores' for c in self.core_sets)}")
+
+    def wait_ready(self, timeout=None) -> bool:
+        return self._ready.wait(timeout)
+
+    def _watch(self):
+        # A replica that dies (OOM, segfault) sends nothing; report its exit through
+        # the results queue, behind everything it managed to send before dying
+        alive = {process.sentinel: i for i, process in enumerate(self._processes)}
+        while alive:
+            for sentinel in mp.connection.wait(list(alive)):
+                index = alive.pop(sentinel)
+                self._results.put(("exited", index, None, self._processes[index].exitcode))
+
+    def _retire(self, index, reason):
+        with self._lock:
+            self._inflight[index] = float("inf")  # never picked again
+            stranded = [rid for rid, (_, i, _) in self._futures.items() if i == index]
+            futures = [self._futures.pop(rid)[0] for rid in stranded]
+        for future in futures:
+            if not future.done():
+                future.set_exception(RuntimeError(f"LLM replica {index} {reason}"))
+
+    def _started_one(self, index):
+        if index not in self._reported:
+            self._reported.add(index)
+            if len(self._reported) == len(self._processes):
+                self._ready.set()
+
+    def _collect(self):
+        while True:
+            kind, index, request_id, payload = self._results.get()
+            if kind == "closed":
+                return
+            if kind == "exited":
+                if not self._closed and self._inflight[index] != float("inf"):
+                    logging.error(f"❌ LLM replica {index} exited unexpectedly (exit code {payload})")
+                    self._retire(index, f"exited with code {payload}")
+                self._started_one(index)
+                continue
+            if kind in ("ready", "failed"):
+                if kind == "failed":
+                    logging.error(f"❌ LLM replica {index} failed to load: {payload}")
+                    self._retire(index, "failed to load")
+                self._started_one(index)
+                continue
+            with self._lock:
+                future, _, key = self._futures.pop(request_id, (None, None, None))
+                self._inflight[index] -= 1
+            if future is None or future.done():
+                continue
+            if kind == "error":
+                future.set_exception(RuntimeError(payload))
+                continue
+            if key is not None and payload != "[Error]" and not future.cancel_token.cancelled:
+                self.cache.put(key, payload)
+            future.set_result(payload)
+
+    def submit(self, item) -> Future:
+        if self._closed:
+            raise RuntimeError("LlmPool is closed")
+        future = Future()
+        key = None
+        if self.cache is not None:
+            from vision_rag_summarizer.modules.text_llm_wrapper import summary_cache_key
+            key = summary_cache_key(self._model_id, item[0] if isinstance(item, tuple) else item)
+            cached = self.cache.get(key)
+            if cached is not None:
+                future.cancel_token = CancellationToken()  # nothing to stop
+                future.set_running_or_notify_cancel()
+                future.set_result(cached)
+                return future
+        with self._lock:
+            index = min(range(len(self._inflight)), key=self._inflight.__getitem__)
+            if self._inflight[index] == float("inf"):
+                raise RuntimeError("No LLM replica loaded")
+            request_id = next(self._ids)
+            self._inflight[index] += 1
+            self._futures[request_id] = (future, index, key)
+        future.cancel_token = _RemoteCancel(self._cancels[index], request_id)
+        # Sent straight to the replica, so it counts as running from here on
+        future.set_running_or_notify_cancel()
+        self._requests[index].put((request_id, item))
+        return future
+
+    @property
+    def loads(self) -> list:
+        with self._lock:
+            return list(self._inflight)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        for requests in self._requests:
+            requests.put(None)
+        for process in self._processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(("closed", None, None, None))
+        self._collector.join(timeout=5)
@@ -0,0 +1,107 @@
+import logging
+import platform
+import threading
+import time
+
+import torch
+
+def detect_device() -> torch.device:
+    """Prefer CUDA, then MPS on macOS >= 14, else CPU."""
+    if torch.cuda.is_available():
+        return torch.device("cuda")
+    if (platform.system() == "Darwin" and torch.backends.mps.is_available()
+            and platform.mac_ver()[0] >= "14.0"):
+        return torch.device("mps")
+    return torch.device("cpu")
+
+class ModelRegistry:
+    """
+    Named, lazily created shared instances (models, tokenizers, queues).
+
+    get(name) builds the instance on first use and hands the same object to
+    every caller and thread afterwards; concurrent first calls wait for one
+    load. prewarm() starts loading in the background so model start-up
+    overlaps with rasterization and OCR.
+    """
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, factory):
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"No model registered as '{name}'")
+        with self._locks[name]:
+            if name not in self._instances:
+                start = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                logging.info(f"📦 Loaded {name} in {time.perf_counter() - start:.1f}s")
+            return self._instances[name]
+
+    def loaded(self, name) -> bool:
+        return name in self._instances
+
+    def prewarm(self, *names) -> threading.Thread:
+        names = names or tuple(self._factories)
+
+        def load_all():
+            for name in names:
+                try:
+                    self.get(name)
+                except Exception as e:
+                    logging.error(f"❌ Pre-warming {name} failed: {e}")
+
+        thread = threading.Thread(target=load_all, name="model-prewarm", daemon=True)
+        thread.start()
+        return thread
+
+    def close(self):
+        """Closes loaded instances that have a close() (e.g. batch queues)."""
+        for name, instance in list(self._instances.items()):
+            if hasattr(instance, "close"):
+                instance.close()
+        self._instances.clear()
+
+def build_registry(blip_path, llm_path, cache=None, blip_options=None, llm_options=None, batch_options=None,
+                   caption_batch_options=None, llm_replicas=None):
+    """
+    Registry with the pipeline's shared models:
+
+    - "blip": BlipWrapper
+    - "caption_queue": blip.batcher(**caption_batch_options)
+    - "text_llm": TextLlmWrapper
+    - "llm_queue": text_llm.batcher(**batch_options), or with llm_replicas an
+      LlmPool of that many core-pinned replica processes (0 = one per 8 cores)
+    - "tokenizer": a separate LLM tokenizer for prompt building (loads in
+      milliseconds, so prompts can be measured before the model is ready)
+    - "embedder": the RAG sentence embedder
+    """
+    from transformers import AutoTokenizer
+    from vision_rag_summarizer.modules.blip_wrapper import BlipWrapper
+    from vision_rag_summarizer.modules.text_llm_wrapper import TextLlmWrapper
+    from vision_rag_summarizer.modules import rag_store
+
+    registry = ModelRegistry()
+    registry.register("blip", lambda: BlipWrapper(blip_path, cache=cache, **(blip_options or {})))
+    registry.register("caption_queue", lambda: registry.get("blip").batcher(**(caption_batch_options or {})))
+    registry.register("text_llm", lambda: TextLlmWrapper(llm_path, cache=cache, **(llm_options or {})))
+    if llm_replicas is None:
+        registry.register("llm_queue", lambda: registry.get("text_llm").batcher(**(batch_options or {})))
+    else:
+        from vision_rag_summarizer.modules.llm_pool import LlmPool
+        registry.register("llm_queue", lambda: LlmPool(
+            llm_path, replicas=llm_replicas or None, cache=cache,
+            **(batch_options or {}), **(llm_options or {})
+        ))
+    registry.register("tokenizer", lambda: AutoTokenizer.from_pretrained(llm_path, local_files_only=True))
+    registry.register("embedder", rag_store.get_embedder)
+    return registry
@@ -1,28 +1,223 @@
 import os
-from PIL import Image
+import re
+import time
+import fitz  # pymupdf
 import pytesseract
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+
+from vision_rag_summarizer.modules.page import load_image
+from vision_rag_summarizer.modules.pdf_to_images import FITZ_LOCK
+from vision_rag_summarizer.modules.result_cache import make_key, content_digest
 
-def extract_text_from_image(image_path, lang="eng"):
+# Pages are OCRed concurrently (one tesseract process each, see _ocr_map and the
+# pipeline's extract pool); tesseract's own OpenMP pool would oversubscribe the
+# cores. Set once here, before any tesseract starts, unless the user chose a limit.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+def extract_text_from_image(image_path, lang="eng", cache=None):
+    # image_path may also be an in-memory Page or PIL image
     try:
-        image = Image.open(image_path)
+        key = None
+        if cache is not None:
+            key = make_key("ocr", "tesseract", lang, content_digest(image_path))
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        image = load_image(image_path)
         text = pytesseract.image_to_string(image, lang=lang)
         logging.info(f"📝 OCR extracted from: {image_path}")
+        if key is not None:
+            cache.put(key, text)
         return text
     except Exception as e:
         logging.error(f"❌ OCR failed for {image_path}: {e}")
         return "[OCR failed]"
 
-def extract_text_with_images(image_folder, lang="eng"):
+def default_ocr_workers():
+    return os.cpu_count() or 1
+
+def _timed_ocr(source, lang, cache=None):
+    start = time.perf_counter()
+    text = extract_text_from_image(source, lang, cache)
+    return text, time.perf_counter() - start
+
+def _ocr_map(sources, lang="eng", workers=None, cache=None):
+    """
+    OCRs an iterable of images and yields (text, seconds) in input order.
+
+    Tesseract runs as a subprocess per call, so a thread pool is enough to keep
+    every core busy (its OpenMP threading is limited at import, see above).
+    Sources are pulled lazily with at most 2 * workers images in flight.
+    """
+    workers = workers or 1
+    if workers == 1:
+        for source in sources:
+            yield _timed_ocr(source, lang, cache)
+        return
+
+    sources = iter(sources)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for source in sources:
+            pending.append(pool.submit(_timed_ocr, source, lang, cache))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _page_sort_key(filename):
+    # Numeric page order: page_2.png before page_10.png
+    match = re.search(r"(\d+)", filename)
+    return (int(match.group(1)) if match else -1, filename)
+
+def extract_text_with_images(image_folder, lang="eng", workers=None, cache=None):
     data = []
-    image_files = sorted([f for f in os.listdir(image_folder) if f.endswith(".png")])
+    image_files = sorted(
+        (f for f in os.listdir(image_folder) if f.endswith(".png")), key=_page_sort_key
+    )
+    image_paths = [os.path.join(image_folder, f) for f in image_files]
 
-    for image_file in image_files:
-        image_path = os.path.join(image_folder, image_file)
-        text = extract_text_from_image(image_path, lang)
+    for image_path, (text, seconds) in zip(image_paths, _ocr_map(image_paths, lang, workers, cache)):
+        logging.info(f"⏱️ OCR {image_path}: {seconds:.2f}s")
         data.append({
             "image_path": image_path,
-            "text": text
+            "text": text,
+            "ocr_seconds": seconds
+        })
+
+    return data
+
+def extract_text_from_pages(pages, lang="eng", workers=None, cache=None):
+    """OCRs in-memory Page objects; no PNG round trip through disk."""
+    pages = list(pages)
+    data = []
+    for page, (text, seconds) in zip(pages, _ocr_map(pages, lang, workers, cache)):
+        logging.info(f"⏱️ OCR page {page.number}: {seconds:.2f}s")
+        data.append({
+            "page_number": page.number,
+            "page": page,
+            "image_path": page.image_path,
+            "text": text,
+            "ocr_seconds": seconds
         })
 
     return data
+
+# Pages with fewer usable characters than this in their text layer go to OCR
+MIN_NATIVE_CHARS = 20
+# Image blocks covering at least this fraction of the page are OCR'd as regions
+MIN_IMAGE_REGION = 0.05
+
+def _is_usable_text(text, min_chars=MIN_NATIVE_CHARS):
+    chars = "".join(text.split())
+    if len(chars) < min_chars:
+        return False
+    # Broken font encodings come out as replacement chars / symbol soup
+    readable = sum(c.isalnum() or c in ".,;:!?'\"()[]-–—%$€£&/+*=@#" for c in chars)
+    return "�" not in chars and readable / len(chars) >= 0.8
+
+def _region_image(fitz_page, rect, page, dpi):
+    # Crop from the in-memory render if we have it, otherwise rasterize just the clip
+    if page is not None and page.samples is not None:
+        scale = page.dpi / 72
+        box = tuple(int(v * scale) for v in (rect.x0, rect.y0, rect.x1, rect.y1))
+        return page.to_image().crop(box)
+    pix = fitz_page.get_pixmap(dpi=dpi, clip=rect, alpha=False)
+    return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+def _native_entry(fitz_page, page_number, page=None):
+    """Text-layer blocks for one page plus the regions that still need OCR."""
+    page_area = abs(fitz_page.rect) or 1
+    blocks = []
+    image_rects = []
+    for x0, y0, x1, y1, text, _, block_type in fitz_page.get_text("blocks", sort=True):
+        if block_type == 0 and text.strip():
+            blocks.append({"bbox": (x0, y0, x1, y1), "text": text.strip(), "source": "native"})
+    # get_text("blocks") leaves image blocks out with the default flags; ask for placements directly
+    for info in fitz_page.get_image_info():
+        rect = fitz.Rect(info["bbox"]) & fitz_page.rect
+        if abs(rect) / page_area >= MIN_IMAGE_REGION and rect not in image_rects:
+            image_rects.append(rect)
+
+    entry = {
+        "page_number": page_number,
+        "page": page,
+        "image_path": page.image_path if page else None,
+        "method": "native",
+        "blocks": blocks,
+        "ocr_seconds": 0.0
+    }
+    if not _is_usable_text("\n".join(b["text"] for b in blocks)):
+        entry["method"] = "ocr"
+        entry["blocks"] = []
+        image_rects = [fitz_page.rect]
+    return entry, image_rects
+
+def _add_ocr_block(entry, rect, text, seconds):
+    entry["ocr_seconds"] += seconds
+    text = text.strip()
+    if text or entry["method"] == "ocr":
+        if entry["method"] == "native":
+            entry["method"] = "native+ocr"
+        entry["blocks"].append({"bbox": tuple(rect), "text": text, "source": "ocr"})
+
+def _finish_entry(entry):
+    entry["text"] = "\n".join(b["text"] for b in entry["blocks"])
+    logging.info(f"📝 Page {entry['page_number']}: text via {entry['method']} "
+                 f"(OCR {entry['ocr_seconds']:.2f}s)")
+    return entry
+
+def extract_page_text(doc, page_number, page=None, lang="eng", dpi=300, cache=None):
+    """
+    Single-page version of extract_text_from_pdf for streaming pipelines.
+
+    Document access is serialized on FITZ_LOCK; Tesseract runs outside it, so
+    several threads can extract pages of the same open document concurrently.
+    """
+    with FITZ_LOCK:
+        fitz_page = doc.load_page(page_number - 1)
+        entry, rects = _native_entry(fitz_page, page_number, page)
+        images = [_region_image(fitz_page, rect, page, dpi) for rect in rects]
+
+    for rect, image in zip(rects, images):
+        text, seconds = _timed_ocr(image, lang, cache)
+        _add_ocr_block(entry, rect, text, seconds)
+    return _finish_entry(entry)
+
+def extract_text_from_pdf(pdf_path, pages=None, lang="eng", dpi=300, workers=None, cache=None):
+    """
+    Reads the PDF's native text layer and only OCRs what it can't cover.
+
+    Each entry records "method": "native" (text layer only), "ocr" (empty or
+    garbage text layer, whole page OCR'd) or "native+ocr" (text layer plus OCR
+    of large embedded images), "blocks" with per-block bboxes in PDF points,
+    and "ocr_seconds" spent in Tesseract for the page.
+    """
+    pages_by_number = {p.number: p for p in pages or []}
+    data = []
+    regions = []  # (entry, rect) pairs that need OCR
+
+    with fitz.open(pdf_path) as doc:
+        # Pass 1: text layer for every page, OCR regions only collected
+        for page_index in range(len(doc)):
+            page_number = page_index + 1
+            entry, rects = _native_entry(
+                doc.load_page(page_index), page_number, pages_by_number.get(page_number)
+            )
+            regions.extend((entry, rect) for rect in rects)
+            data.append(entry)
+
+        # Pass 2: OCR the collected regions across the worker pool; images are
+        # rendered lazily here on this thread since fitz documents aren't thread-safe
+        images = (
+            _region_image(doc.load_page(entry["page_number"] - 1), rect, entry["page"], dpi)
+            for entry, rect in regions
+        )
+        for (entry, rect), (text, seconds) in zip(regions, _ocr_map(images, lang, workers, cache)):
+            _add_ocr_block(entry, rect, text, seconds)
+
+    return [_finish_entry(entry) for entry in data]
@@ -1,9 +1,10 @@
 from transformers import LlavaForConditionalGeneration, LlavaProcessor
-from PIL import Image, ImageStat
 import torch
 from pathlib import Path
 import logging
 
+from vision_rag_summarizer.modules.page import prepare_image
+
 class LlavaWrapper:
     def __init__(self, model_path: str):
         model_path = Path(model_path)
@@ -18,6 +19,8 @@ class LlavaWrapper:
             local_files_only=True,
             use_fast=True
         )
+        # Prompts are batched; generation continues from the right edge
+        self.processor.tokenizer.padding_side = "left"
 
         logging.info("🧠 Loading LLaVA model...")
         self.model = LlavaForConditionalGeneration.from_pretrained(
@@ -30,30 +33,53 @@ class LlavaWrapper:
         logging.info("✅ Model and processor loaded")
 
     def run(self, image_path: str, prompt: str) -> str:
-        try:
-            image = Image.open(image_path).convert("RGB")
+        return self.run_batch([image_path], prompt, batch_size=1)[0]
+
+    def run_batch(self, image_paths, prompt: str, batch_size: int = 4) -> list:
+        """
+        Describes many images with one left-padded generate call per batch of
+        batch_size; images are loaded as their batch fills, and results come
+        back in the same order as image_paths.
+        """
+        outputs = [None] * len(image_paths)
+        todo = []  # (index, image), flushed every batch_size items
+
+        def flush():
+            try:
+                inputs = self.processor(
+                    text=[prompt] * len(todo),
+                    images=[image for _, image in todo],
+                    padding=True,
+                    return_tensors="pt"
+                ).to(self.device)
+
+                with torch.inference_mode():
+                    generated_ids = self.model.generate(**inputs, max_new_tokens=32)
 
-            # Resize to safe size
-            max_size = (1024, 1024)
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
+                decoded = self.processor.batch_decode(generated_ids, skip_special_tokens=True)
+            except Exception as e:
+                logging.error(f"❌ LLaVA failed for batch of {len(todo)} images: {e}")
+                decoded = ["[Error]"] * len(todo)
 
-            # Check for blank image
-            stat = ImageStat.Stat(image)
-            if sum(stat.mean) / len(stat.mean) > 250:
-                logging.warning(f"⚠️ Skipping nearly blank image: {image_path}")
-                return "[Skipped blank image]"
+            for (i, _), text in zip(todo, decoded):
+                outputs[i] = text
+            todo.clear()
 
-            inputs = self.processor(
-                text=prompt,
-                images=image,
-                return_tensors="pt"
-            ).to(self.device)
+        for i, image_path in enumerate(image_paths):
+            try:
+                image = prepare_image(image_path, max_size=1024)
+                if image is None:
+                    outputs[i] = "[Skipped blank image]"
+                    continue
+                todo.append((i, image))
+            except Exception as e:
+                logging.error(f"❌ LLaVA failed for {image_path}: {e}")
+                outputs[i] = "[Error]"
 
-            with torch.inference_mode():
-                generated_ids = self.model.generate(**inputs, max_new_tokens=32)
+            if len(todo) >= batch_size:
+                flush()
 
-            return self.processor.batch_decode(generated_ids, skip_special_tokens=True)[0]
+        if todo:
+            flush()
 
-        except Exception as e:
-            logging.error(f"❌ LLaVA failed for {image_path}: {e}")
-            return "[Error]"
+        return outputs
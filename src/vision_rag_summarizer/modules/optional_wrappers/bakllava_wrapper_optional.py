@@ -1,9 +1,10 @@
 from transformers import LlavaForConditionalGeneration, LlavaProcessor
-from PIL import Image, ImageStat
 import torch
 from pathlib import Path
 import logging
-import platform
+
+from vision_rag_summarizer.modules.model_registry import detect_device
+from vision_rag_summarizer.modules.page import prepare_image
 
 class BakLlavaWrapper:
     def __init__(self, model_path: str):
@@ -11,14 +12,7 @@ class BakLlavaWrapper:
         if not model_path.is_dir():
             raise FileNotFoundError(f"Model directory not found: {model_path.resolve()}")
 
-        # Device autodetect
-        system = platform.system()
-        if torch.cuda.is_available():
-            self.device = torch.device("cuda")
-        elif system == "Darwin" and platform.mac_ver()[0] >= "14.0":
-            self.device = torch.device("mps")
-        else:
-            self.device = torch.device("cpu")
+        self.device = detect_device()
 
         logging.info(f"🧠 Loading BakLLaVA from {model_path} on {self.device}")
 
@@ -26,51 +20,72 @@ class BakLlavaWrapper:
         self.processor = LlavaProcessor.from_pretrained(
             model_path, local_files_only=True, use_fast=True
         )
+        # Prompts are batched; generation continues from the right edge
+        self.processor.tokenizer.padding_side = "left"
         self.model = LlavaForConditionalGeneration.from_pretrained(
             model_path,
             torch_dtype=torch.float16 if torch.cuda.is_available() else torch.float32,
-            local_files_only=True
+            local_files_only=True,
+            low_cpu_mem_usage=True
         ).to(self.device)
         self.model.eval()
 
         logging.info("✅ BakLLaVA model and processor loaded")
 
     def run(self, image_path: str, prompt: str) -> str:
-        try:
-            image = Image.open(image_path).convert("RGB")
-
-            # Resize to safe size for ViT patching
-            max_size = (768, 768)
-            image.thumbnail(max_size, Image.Resampling.LANCZOS)
-
-            # Skip blank images
-            stat = ImageStat.Stat(image)
-            if sum(stat.mean) / len(stat.mean) > 250:
-                logging.warning(f"⚠️ Skipping blank image: {image_path}")
-                return "[Skipped blank image]"
-
-            # Build inputs: image + prompt
-            inputs = self.processor(
-                text=prompt,
-                images=image,
-                return_tensors="pt"
-            ).to(self.device)
-
-            # Generate a longer summary
-            with torch.inference_mode():
-                generated_ids = self.model.generate(
-                    **inputs,
-                    max_new_tokens=256,
-                    num_beams=4,
-                    early_stopping=True,
-                    no_repeat_ngram_size=2,   # optional to reduce repetition
-                )
-
-            # Decode and return
-            return self.processor.batch_decode(
-                generated_ids, skip_special_tokens=True
-            )[0]
-
-        except Exception as e:
-            logging.error(f"❌ BakLLaVA failed for {image_path}: {e}")
-            return "[Error]"
+        return self.run_batch([image_path], prompt, batch_size=1)[0]
+
+    def run_batch(self, image_paths, prompt: str, batch_size: int = 4) -> list:
+        """
+        Describes many images with one left-padded generate call per batch of
+        batch_size; images are loaded as their batch fills, and results come
+        back in the same order as image_paths.
+        """
+        outputs = [None] * len(image_paths)
+        todo = []  # (index, image), flushed every batch_size items
+
+        def flush():
+            try:
+                inputs = self.processor(
+                    text=[prompt] * len(todo),
+                    images=[image for _, image in todo],
+                    padding=True,
+                    return_tensors="pt"
+                ).to(self.device)
+
+                with torch.inference_mode():
+                    generated_ids = self.model.generate(
+                        **inputs,
+                        max_new_tokens=256,
+                        num_beams=4,
+                        early_stopping=True,
+                        no_repeat_ngram_size=2,   # optional to reduce repetition
+                    )
+
+                decoded = self.processor.batch_decode(generated_ids, skip_special_tokens=True)
+            except Exception as e:
+                logging.error(f"❌ BakLLaVA failed for batch of {len(todo)} images: {e}")
+                decoded = ["[Error]"] * len(todo)
+
+            for (i, _), text in zip(todo, decoded):
+                outputs[i] = text
+            todo.clear()
+
+        for i, image_path in enumerate(image_paths):
+            try:
+                image = prepare_image(image_path)
+                if image is None:
+                    outputs[i] = "[Skipped blank image]"
+                    continue
+                todo.append((i, image))
+            except Exception as e:
+                logging.error(f"❌ BakLLaVA failed for {image_path}: {e}")
+                outputs[i] = "[Error]"
+
+            if len(todo) >= batch_size:
+                flush()
+
+        if todo:
+            flush()
+
+        return outputs
@@ -4,13 +4,13 @@ import logging
 import time
 from pathlib import Path
 
-from vision_rag_summarizer.modules.slides_manifest import create_slide_manifest
+from vision_rag_summarizer.modules.slides_manifest import render_slides_video
 from vision_rag_summarizer.modules.pdf_to_images import pdf_to_images
 from vision_rag_summarizer.modules.ocr_extract import extract_text_with_images
 from vision_rag_summarizer.modules.rag_store import build_vector_store, query_similar
 from vision_rag_summarizer.modules.blip_wrapper import BlipWrapper
 from vision_rag_summarizer.modules.text_llm_wrapper import TextLlmWrapper
-from vision_rag_summarizer.modules.video_generator import generate_video_from_png_slides
+from vision_rag_summarizer.modules.tts import get_narrator
 from vision_rag_summarizer.utils.time_out import run_with_timeout
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -29,7 +29,7 @@ async def summarize_page(blip, text_llm, entry, page_number, use_rag):
         "Summarize this for a video script:"
     ]
     prompt = "\n\n".join(p for p in prompt_parts if p)
-    summary = await run_with_timeout(text_llm.run, prompt, timeout=180)
+    summary = await run_with_timeout(text_llm.run, prompt, timeout=180, cancellable=True)
     return f"--- Page {page_number} ---\n{summary}\n"
 
 async def main():
@@ -79,34 +79,17 @@ async def main():
     os.rmdir(img_folder)
     logging.info("✅ Cleaned up images.")
 
-    # 7) Create slide PNGs & manifest
-    logging.info("[7] Creating slides…")
-    png_slides = create_slide_manifest(
+    # 7) Render slides straight into the encoder (no PNGs), narrated per slide
+    logging.info("[7] Rendering narrated slide video…")
+    video_path = "videos/summary_video.mp4"
+    render_slides_video(
         summary_file,
-        output_folder="slides",
+        output_path=video_path,
         lines_per_slide=5,
-        manifest_path="slides/manifest.json",
         slide_size=(640, 480),
-        fontsize=24
-    )
-    logging.info(f"✅ Created {len(png_slides)} PNG slides.")
-
-    # 8) Verify PNG slides exist
-    slide_folder = Path("slides")
-    slide_images = sorted(slide_folder.glob("slide_*.png"))
-    if not slide_images:
-        raise FileNotFoundError(f"No slide PNGs found in {slide_folder.resolve()}")
-    logging.info(f"✅ Found {len(slide_images)} slide images:")
-    for img in slide_images:
-        logging.info(f"   • {img.name}")
-
-    # 9) Generate video
-    logging.info("[8] Generating video…")
-    os.makedirs("videos", exist_ok=True)
-    video_path = "videos/summary_video.mp4"
-    generate_video_from_png_slides(
-        slides_folder="slides",
-        output_path=video_path
+        fontsize=24,
+        narrator=get_narrator(),
+        manifest_path="slides/manifest.json"
     )
     logging.info(f"✅ Video saved to {Path(video_path).resolve()}")
 
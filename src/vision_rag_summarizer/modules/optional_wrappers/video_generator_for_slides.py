@@ -2,9 +2,10 @@ import os
 import logging
 import subprocess
 import glob
-from gtts import gTTS
 import imageio_ffmpeg  # Bundled FFmpeg binary
 
+from vision_rag_summarizer.modules.tts import get_narrator
+
 # Path to bundled ffmpeg executable
 FFMPEG_EXE = imageio_ffmpeg.get_ffmpeg_exe()
 
@@ -12,14 +13,17 @@ FFMPEG_EXE = imageio_ffmpeg.get_ffmpeg_exe()
 def generate_video_from_png_slides(
     slides_folder: str = 'slides',
     output_path: str = 'videos/summary_video.mp4',
-    fps: int = 1
+    fps: int = 1,
+    narrator=None,
+    tts_workers: int = 4
 ):
     """
     Assembles a narrated video from PNG slides and matching TXT content.
 
     Steps:
       1) Discover PNG slides in slides_folder
-      2) Generate TTS audio via gTTS for each TXT slide if missing
+      2) Generate TTS audio for the TXT slides missing it, in parallel
+         (narrator: tts.Narrator, default cached pyttsx3)
       3) Create one MP4 segment per slide, looping image and audio until shortest ends
       4) Concatenate all segments into the final MP4
       5) Cleanup intermediate files
@@ -35,21 +39,26 @@ def generate_video_from_png_slides(
     # 2) Prepare output directory
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
-    # 3) Generate audio and create segments
-    temp_segments = []
+    # 3) Generate missing audio for all slides at once, then create segments
+    narrator = narrator or get_narrator()
+    audio_paths = {}
+    missing = []
     for img_path in slide_images:
         base = os.path.splitext(os.path.basename(img_path))[0]
         txt_path = os.path.join(slides_folder, f"{base}.txt")
-        audio_path = os.path.join(slides_folder, f"{base}.mp3")
-        segment_path = os.path.join(slides_folder, f"segment_{base}.mp4")
+        audio_paths[base] = os.path.join(slides_folder, f"{base}.{narrator.extension}")
+        if not os.path.exists(audio_paths[base]) and os.path.exists(txt_path):
+            with open(txt_path, 'r', encoding='utf-8') as f:
+                missing.append((f.read().strip(), audio_paths[base]))
+    if missing:
+        logging.info(f"🔊 Generating audio for {len(missing)} slides ({narrator.voice})...")
+        narrator.synthesize_many(missing, workers=tts_workers)
 
-        # Generate audio if it doesn't exist
-        if not os.path.exists(audio_path) and os.path.exists(txt_path):
-            text = open(txt_path, 'r', encoding='utf-8').read().strip()
-            logging.info(f"🔊 Generating audio for {base} via gTTS...")
-            tts = gTTS(text)
-            tts.save(audio_path)
-            logging.info(f"🎵 Audio saved to {audio_path}")
+    temp_segments = []
+    for img_path in slide_images:
+        base = os.path.splitext(os.path.basename(img_path))[0]
+        audio_path = audio_paths[base]
+        segment_path = os.path.join(slides_folder, f"segment_{base}.mp4")
 
         if not os.path.exists(audio_path):
             logging.warning(f"Skipping {base}: audio not found and no text to generate")
@@ -0,0 +1,91 @@
+import os
+import logging
+from dataclasses import dataclass, field
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageStat
+
+@dataclass
+class Page:
+    """
+    A rendered PDF page held in memory as packed RGB samples.
+
+    Consumers read pixels through to_array()/to_image(); a file on disk is
+    only written when materialize() is called.
+    """
+    number: int
+    width: int
+    height: int
+    samples: object  # bytes or memoryview of packed RGB rows
+    stride: int = 0
+    dpi: int = 300
+    source: str = None
+    image_path: str = None
+    _pixmap: object = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self):
+        if not self.stride:
+            self.stride = self.width * 3
+
+    @classmethod
+    def from_pixmap(cls, pix, number, dpi=300, source=None):
+        # samples_mv is a zero-copy view; keep the pixmap alive alongside it
+        samples = getattr(pix, "samples_mv", None)
+        if samples is None:
+            samples = pix.samples
+        return cls(number, pix.width, pix.height, samples, pix.stride, dpi, source, _pixmap=pix)
+
+    def to_array(self) -> np.ndarray:
+        """Zero-copy (height, width, 3) uint8 view of the page pixels."""
+        rows = np.frombuffer(self.samples, dtype=np.uint8).reshape(self.height, self.stride)
+        return rows[:, : self.width * 3].reshape(self.height, self.width, 3)
+
+    def to_image(self) -> Image.Image:
+        return Image.frombuffer(
+            "RGB", (self.width, self.height), self.samples, "raw", "RGB", self.stride, 1
+        )
+
+    def materialize(self, output_folder="images", compress_level=1) -> str:
+        """Writes the page as PNG once and returns the path (fast zlib level by default)."""
+        if self.image_path and os.path.exists(self.image_path):
+            return self.image_path
+        os.makedirs(output_folder, exist_ok=True)
+        image_path = os.path.join(output_folder, f"page_{self.number}.png")
+        self.to_image().save(image_path, compress_level=compress_level)
+        self.image_path = image_path
+        logging.info(f"🖼️ Saved image: {image_path}")
+        return image_path
+
+    def release(self):
+        """Drops the pixel buffer once a file copy exists and nothing else needs the pixels."""
+        self.samples = None
+        self._pixmap = None
+
+    def __str__(self):
+        return self.image_path or f"page {self.number}"
+
+def load_image(source) -> Image.Image:
+    """Returns a PIL image for a file path, a Page or an already-open image."""
+    if isinstance(source, Page):
+        if source.samples is None:
+            return Image.open(source.image_path)
+        return source.to_image()
+    if isinstance(source, Image.Image):
+        return source
+    return Image.open(Path(source))
+
+def prepare_image(source, max_size=768):
+    """
+    RGB copy of source (path, Page or PIL image) scaled down to fit
+    max_size x max_size for a vision model, or None for a nearly blank page.
+    """
+    image = load_image(source).convert("RGB")
+    image.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+
+    # Skip blank images
+    stat = ImageStat.Stat(image)
+    if sum(stat.mean) / len(stat.mean) > 250:
+        logging.warning(f"⚠️ Skipping blank image: {source}")
+        return None
+    return image
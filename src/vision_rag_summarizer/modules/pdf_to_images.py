@@ -1,20 +1,119 @@
 import fitz  # pymupdf
 import os
 import logging
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
 
-def pdf_to_images(pdf_path, output_folder="images"):
+from vision_rag_summarizer.modules.page import Page
+
+# Per-worker document handle, opened once by _init_worker
+_worker_doc = None
+
+# PyMuPDF isn't thread-safe: threads touching fitz documents in this process take this lock
+FITZ_LOCK = threading.Lock()
+
+def pdf_to_images(pdf_path, output_folder="images", workers=None, dpi=300):
     os.makedirs(output_folder, exist_ok=True)
-    doc = fitz.open(pdf_path)
     image_paths = []
 
+    if workers and workers > 1:
+        # Parallel mode: pages arrive in order from the process pool
+        for page_number, image in iter_pdf_pages(pdf_path, dpi=dpi, workers=workers):
+            image_path = os.path.join(output_folder, f"page_{page_number}.png")
+            image.save(image_path)
+            image_paths.append(image_path)
+            logging.info(f"🖼️ Saved image: {image_path}")
+        return image_paths
+
+    doc = fitz.open(pdf_path)
+
     logging.info(f"📄 PDF has {len(doc)} pages")
 
     for page_number in range(len(doc)):
         page = doc.load_page(page_number)
-        pix = page.get_pixmap(dpi=300)  # high DPI for OCR
+        pix = page.get_pixmap(dpi=dpi)  # high DPI for OCR
         image_path = os.path.join(output_folder, f"page_{page_number + 1}.png")
         pix.save(image_path)
         image_paths.append(image_path)
         logging.info(f"🖼️ Saved image: {image_path}")
 
     return image_paths
+
+def _init_worker(pdf_path):
+    # Each worker opens its own fitz document; handles can't be shared across processes
+    global _worker_doc
+    _worker_doc = fitz.open(pdf_path)
+
+def _render_page(page_index, dpi):
+    pix = _worker_doc.load_page(page_index).get_pixmap(dpi=dpi, alpha=False)
+    return page_index + 1, pix.width, pix.height, pix.stride, pix.samples
+
+def render_pages(pdf_path, dpi=300, workers=None, max_in_flight=None, ordered=True):
+    """
+    Yields in-memory Page objects without writing any PNGs.
+
+    With workers <= 1 pages are rendered in-process and wrap the pixmap samples
+    without copying; otherwise they come from the process pool in iter_pdf_pages.
+    """
+    if workers and workers > 1:
+        yield from _iter_rendered(pdf_path, dpi, workers, max_in_flight, ordered)
+        return
+
+    with FITZ_LOCK:
+        doc = fitz.open(pdf_path)
+    try:
+        logging.info(f"📄 PDF has {len(doc)} pages")
+        for page_index in range(len(doc)):
+            with FITZ_LOCK:
+                pix = doc.load_page(page_index).get_pixmap(dpi=dpi, alpha=False)
+            yield Page.from_pixmap(pix, page_index + 1, dpi=dpi, source=str(pdf_path))
+    finally:
+        with FITZ_LOCK:
+            doc.close()
+
+def iter_pdf_pages(pdf_path, dpi=300, workers=None, max_in_flight=None, ordered=True):
+    """
+    Rasterizes pages across a process pool and yields (page_number, PIL.Image).
+
+    :param workers: Number of worker processes (defaults to os.cpu_count())
+    :param max_in_flight: Max pages rendered but not yet consumed (defaults to 2 * workers)
+    :param ordered: Yield in page order if True, otherwise in completion order
+    """
+    for page in _iter_rendered(pdf_path, dpi, workers, max_in_flight, ordered):
+        yield page.number, page.to_image()
+
+def _iter_rendered(pdf_path, dpi, workers, max_in_flight, ordered):
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = max(1, max_in_flight or 2 * workers)
+
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+    logging.info(f"📄 PDF has {page_count} pages, rendering with {workers} workers")
+
+    next_page = 0
+    pending = deque()
+    # spawn: this runs from a pipeline thread while model loaders and other
+    # executors hold locks, which a forked child would inherit still locked
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker, initargs=(str(pdf_path),)
+    ) as pool:
+        while next_page < page_count or pending:
+            # Keep at most max_in_flight pages submitted or waiting to be consumed
+            while next_page < page_count and len(pending) < max_in_flight:
+                pending.append(pool.submit(_render_page, next_page, dpi))
+                next_page += 1
+
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                done = [f for f in pending if f in finished]
+                for f in done:
+                    pending.remove(f)
+
+            for future in done:
+                page_number, width, height, stride, samples = future.result()
+                yield Page(page_number, width, height, samples, stride, dpi, str(pdf_path))
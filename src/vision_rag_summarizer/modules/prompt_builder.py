@@ -0,0 +1,89 @@
+import math
+
+# Room left for the model's answer within TinyLlama's 2048-token context
+DEFAULT_PROMPT_BUDGET = 1024
+# Fixed instruction every prompt starts with; its KV cache is shared by all pages
+PROMPT_HEADER = "Summarize the document page below for a narrated video.\n\n"
+
+def _ids(text, tokenizer):
+    return tokenizer(text, add_special_tokens=False).input_ids
+
+def count_tokens(text, tokenizer=None):
+    """Exact count with the LLM tokenizer; ~4/3 tokens per word without one."""
+    if tokenizer is not None:
+        return len(_ids(text, tokenizer))
+    return math.ceil(len(text.split()) * 4 / 3)
+
+def truncate_tokens(text, max_tokens, tokenizer=None):
+    if max_tokens <= 0:
+        return ""
+    if tokenizer is not None:
+        ids = _ids(text, tokenizer)
+        return text if len(ids) <= max_tokens else tokenizer.decode(ids[:max_tokens])
+    words = text.split()
+    keep = int(max_tokens * 3 / 4)
+    return text if len(words) <= keep else " ".join(words[:keep])
+
+def chunk_text(text, max_tokens=128, overlap=32, tokenizer=None):
+    """Splits page text into overlapping windows of at most max_tokens for the RAG store."""
+    if not text.strip():
+        return []
+    step = max(1, max_tokens - overlap)
+    if tokenizer is not None:
+        ids = _ids(text, tokenizer)
+        windows = [ids[i:i + max_tokens] for i in range(0, max(1, len(ids) - overlap), step)]
+        return [tokenizer.decode(w).strip() for w in windows if w]
+    words = text.split()
+    size, step = int(max_tokens * 3 / 4), int(step * 3 / 4) or 1
+    return [" ".join(words[i:i + size]) for i in range(0, max(1, len(words) - int(overlap * 3 / 4)), step)]
+
+def build_prompt(caption, rag_chunks, text, tokenizer=None, budget=DEFAULT_PROMPT_BUDGET, text_share=0.7,
+                 return_prefix=False):
+    """
+    Assembles the page summary prompt within `budget` tokens.
+
+    Parts are filled by priority: the fixed scaffolding, the caption, the
+    page's own text (capped at text_share of what is left while RAG chunks
+    are waiting, so retrieval still gets room), then whole RAG chunks in rank
+    order until the budget is spent; leftover room goes back to the page text.
+
+    The fixed PROMPT_HEADER comes first and the RAG context right after it,
+    so every page shares the header and pages retrieving the same chunks
+    share the longer prefix. With return_prefix=True the result is
+    (prompt, prefixes): the nested prefixes of prompt, shortest first, for
+    TextLlmWrapper's prefix KV cache.
+    """
+    head = "This information is about: "
+    text_label = "The information we \n"
+    tail = "In summary:"
+    rag_label = "RAG context:\n"
+    sep = count_tokens("\n\n", tokenizer)
+
+    remaining = budget - count_tokens(PROMPT_HEADER + head + text_label + tail, tokenizer) - 2 * sep
+    caption = truncate_tokens(caption or "", min(64, remaining), tokenizer)
+    remaining -= count_tokens(caption, tokenizer)
+
+    text_cost = count_tokens(text, tokenizer)
+    text_cap = int(remaining * text_share) if rag_chunks else remaining
+    page_text = truncate_tokens(text, text_cap, tokenizer) if text_cost > text_cap else text
+    remaining -= count_tokens(page_text, tokenizer)
+
+    picked = []
+    if rag_chunks:
+        remaining -= count_tokens(rag_label, tokenizer) + sep
+        for chunk in dict.fromkeys(rag_chunks):  # drop duplicates, keep rank order
+            cost = count_tokens(chunk, tokenizer) + 1
+            if cost <= remaining:
+                picked.append(chunk)
+                remaining -= cost
+        if not picked:
+            remaining += count_tokens(rag_label, tokenizer) + sep
+
+    if page_text is not text and remaining > 0:
+        page_text = truncate_tokens(text, count_tokens(page_text, tokenizer) + remaining, tokenizer)
+
+    prefixes = [PROMPT_HEADER]
+    if picked:
+        prefixes.append(PROMPT_HEADER + rag_label + "\n".join(picked) + "\n\n")
+    prompt = prefixes[-1] + "\n\n".join([f"{head}{caption}", f"{text_label}{page_text}", tail])
+    return (prompt, tuple(prefixes)) if return_prefix else prompt
@@ -0,0 +1,166 @@
+import os
+import time
+import difflib
+import logging
+import argparse
+from pathlib import Path
+
+import torch
+
+from vision_rag_summarizer.modules.result_cache import make_key
+
+QUANT_MODES = (None, "int8", "bf16")
+
+def check_mode(mode, device):
+    """Returns the mode to use on device; int8 dynamic quantization is CPU-only."""
+    if mode not in QUANT_MODES:
+        raise ValueError(f"Unknown quantization mode: {mode} (expected one of {QUANT_MODES})")
+    if mode == "int8" and device.type != "cpu":
+        logging.warning(f"⚠️ int8 dynamic quantization needs CPU, loading float weights on {device}")
+        return None
+    return mode
+
+def quantize_model(model, mode):
+    if mode == "int8":
+        # Linear layers hold nearly all the weights; activations stay float
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    if mode == "bf16":
+        return model.to(torch.bfloat16)
+    return model
+
+def _weights_stamp(model_dir):
+    # Name, size and mtime of the files the float model is built from, so
+    # replacing the weights in place invalidates the artifact
+    stamp = []
+    for f in sorted(Path(model_dir).iterdir()):
+        if f.suffix in (".safetensors", ".bin", ".json"):
+            st = f.stat()
+            stamp.append((f.name, st.st_size, st.st_mtime_ns))
+    return stamp
+
+def artifact_path(model_dir, mode, cache_dir=".cache/quantized") -> Path:
+    # Packed int8 layouts may change between torch versions; keep their artifacts apart
+    key = make_key("quantized", Path(model_dir).resolve(), mode, torch.__version__, _weights_stamp(model_dir))
+    return Path(cache_dir) / f"{key}.pt"
+
+def _int8_skeleton(model_cls, model_dir):
+    """
+    The module tree quantize_dynamic would produce, built from the config
+    alone: float parameters stay on the meta device (no weights read or
+    initialized) and every nn.Linear becomes an empty dynamic int8 Linear.
+    """
+    from accelerate import init_empty_weights
+    from transformers import AutoConfig, GenerationConfig
+
+    config = AutoConfig.from_pretrained(model_dir, local_files_only=True)
+    with init_empty_weights():
+        model = model_cls.from_config(config) if hasattr(model_cls, "from_config") else model_cls(config)
+    try:
+        model.generation_config = GenerationConfig.from_pretrained(model_dir, local_files_only=True)
+    except OSError:  # no generation_config.json; keep the one derived from config
+        pass
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            # quantize_dynamic({nn.Linear}) matches the exact type, not subclasses
+            if type(child) is torch.nn.Linear:
+                setattr(parent, name, torch.ao.nn.quantized.dynamic.Linear(
+                    child.in_features, child.out_features, bias_=child.bias is not None, dtype=torch.qint8
+                ))
+    return model
+
+def load_quantized(model_dir, mode, load_fn, model_cls=None, cache_dir=".cache/quantized"):
+    """
+    Loads the model converted to `mode`.
+
+    int8 weights are saved once as a state_dict under cache_dir, keyed by the
+    model files' names, sizes and mtimes. Later starts build an empty int8
+    skeleton of model_cls from the config and assign the saved tensors
+    (torch.load(weights_only=True)), so the float weights are neither read
+    nor converted again and nothing but tensors is ever unpickled. bf16 is
+    a plain dtype cast and needs no artifact.
+
+    :param load_fn: Loads the float model (first start, or without model_cls)
+    :param model_cls: transformers class for the skeleton (e.g. AutoModelForCausalLM)
+    """
+    if mode is None:
+        return load_fn()
+    if mode == "bf16" or model_cls is None:
+        return quantize_model(load_fn(), mode)
+
+    path = artifact_path(model_dir, mode, cache_dir)
+    if path.exists():
+        logging.info(f"📦 Loading {mode} weights from {path}")
+        try:
+            model = _int8_skeleton(model_cls, model_dir)
+            model.load_state_dict(torch.load(path, weights_only=True, mmap=True), assign=True)
+            if any(t.is_meta for t in (*model.parameters(), *model.buffers())):
+                raise ValueError("artifact does not cover every parameter")
+            return model
+        except Exception as e:  # written by an incompatible version; convert again
+            logging.warning(f"Ignoring quantized artifact {path}: {e}")
+
+    logging.info(f"⚙️ Quantizing {model_dir} to {mode}…")
+    model = quantize_model(load_fn(), mode)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        torch.save(model.state_dict(), tmp)
+        os.replace(tmp, path)
+        logging.info(f"💾 Saved {mode} weights to {path}")
+    except OSError as e:
+        logging.warning(f"Could not save quantized artifact {path}: {e}")
+    return model
+
+def compare_quantization(pdf_path, blip_path, llm_path, modes=QUANT_MODES, pages=3):
+    """
+    Captions and summarizes the first `pages` pages of a sample document in
+    each mode and reports load time, per-page latency and similarity of the
+    outputs to the float32 run.
+    """
+    from vision_rag_summarizer.modules.blip_wrapper import BlipWrapper
+    from vision_rag_summarizer.modules.text_llm_wrapper import TextLlmWrapper
+    from vision_rag_summarizer.modules.ocr_extract import extract_text_from_pdf
+    from vision_rag_summarizer.modules.pdf_to_images import render_pages
+    from vision_rag_summarizer.modules.prompt_builder import build_prompt
+
+    sample = [p for p in render_pages(pdf_path) if p.number <= pages]
+    entries = extract_text_from_pdf(pdf_path, sample)[:pages]
+
+    report = []
+    baseline = None
+    for mode in modes:
+        t0 = time.perf_counter()
+        blip = BlipWrapper(blip_path, quantize=mode)
+        text_llm = TextLlmWrapper(llm_path, quantize=mode, prefix_cache_size=0)
+        load_seconds = time.perf_counter() - t0
+
+        outputs = []
+        t0 = time.perf_counter()
+        for entry in entries:
+            caption = blip.run(entry["page"])
+            summary = text_llm.run(build_prompt(caption, [], entry["text"], text_llm.tokenizer))
+            outputs.append(caption + "\n" + summary)
+        page_seconds = (time.perf_counter() - t0) / max(1, len(entries))
+
+        if baseline is None:
+            baseline = outputs
+        similarity = sum(
+            difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(baseline, outputs)
+        ) / max(1, len(outputs))
+        report.append({"mode": mode or "float32", "load_s": load_seconds,
+                       "page_s": page_seconds, "similarity": similarity})
+        logging.info(f"📊 {mode or 'float32'}: load {load_seconds:.1f}s, "
+                     f"{page_seconds:.2f}s/page, similarity to first mode {similarity:.3f}")
+        del blip, text_llm
+
+    return report
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Compare float32 / int8 / bf16 quality and latency")
+    parser.add_argument("pdf", nargs="?", default="src/data/sample.pdf")
+    parser.add_argument("--blip", default="src/models/blip-image-captioning-base")
+    parser.add_argument("--llm", default="src/models/tinyllama-1.1B-chat")
+    parser.add_argument("--pages", type=int, default=3)
+    args = parser.parse_args()
+    compare_quantization(args.pdf, args.blip, args.llm, pages=args.pages)
@@ -1,18 +1,244 @@
-from sentence_transformers import SentenceTransformer
-import chromadb
-
-# Initialize Chroma and embedder
-chroma_client = chromadb.Client()
-collection = chroma_client.get_or_create_collection("ocr_chunks")
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-
-def build_vector_store(ocr_data):
-    texts = [entry["text"] for entry in ocr_data]
-    embeddings = embedder.encode(texts).tolist()
-    ids = [str(i) for i in range(len(texts))]
-    collection.add(documents=texts, embeddings=embeddings, ids=ids)
-
-def query_similar(text, k=3):
-    query_emb = embedder.encode([text])[0].tolist()
-    results = collection.query(query_embeddings=[query_emb], n_results=k)
-    return results["documents"][0]
+import os
+import json
+import hashlib
+import logging
+import threading
+
+import numpy as np
+
+# Chroma and the embedder are created on first use, not at import
+_client_lock = threading.Lock()
+_embedder_lock = threading.Lock()
+_flat_lock = threading.Lock()
+_client = None
+_embedder = None
+_persist_dir = None
+_backend = "chroma"
+_flat_indexes = {}
+
+EMBED_MODEL = "all-MiniLM-L6-v2"
+BACKENDS = ("chroma", "numpy")
+
+def configure(persist_dir=None, backend="chroma"):
+    """
+    :param persist_dir: Keep indexes on disk here (None = in-memory, lost at exit)
+    :param backend: "chroma" (default, for large corpora) or "numpy", an
+        in-process flat index that suits single documents of a few hundred pages
+    """
+    global _client, _persist_dir, _backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown vector store backend: {backend} (expected one of {BACKENDS})")
+    with _client_lock, _flat_lock:
+        _persist_dir = persist_dir
+        _backend = backend
+        _client = None
+        _flat_indexes.clear()
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            import chromadb
+            _client = chromadb.PersistentClient(path=_persist_dir) if _persist_dir else chromadb.Client()
+        return _client
+
+def get_embedder():
+    global _embedder
+    with _embedder_lock:
+        if _embedder is None:
+            from sentence_transformers import SentenceTransformer
+            _embedder = SentenceTransformer(EMBED_MODEL)
+        return _embedder
+
+def _embed(texts):
+    # Unit-length float32 rows, so a dot product is the cosine similarity
+    return np.asarray(get_embedder().encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+def _store_name(doc_id):
+    # One collection per document; Chroma names must be short and alphanumeric
+    return "doc_" + hashlib.sha1(str(doc_id).encode("utf-8")).hexdigest()[:24]
+
+def _collection(doc_id):
+    return get_client().get_or_create_collection(_store_name(doc_id), metadata={"doc_id": str(doc_id)})
+
+def _text_hash(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+class FlatIndex:
+    """
+    Normalized embeddings in one contiguous float32 matrix (n_chunks x dim).
+
+    Top-k for any number of queries is a single matrix product plus
+    argpartition. Saved as .npy + JSON and memory-mapped back on load.
+    """
+    def __init__(self, ids=None, texts=None, pages=None, matrix=None):
+        self.ids = ids or []
+        self.texts = texts or []
+        self.pages = np.asarray(pages or [], dtype=np.int64)
+        self.matrix = matrix if matrix is not None else np.zeros((0, 0), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, queries, k=3, exclude_pages=None):
+        if not len(self):
+            return [[] for _ in range(len(queries))]
+        scores = queries @ self.matrix.T  # (n_queries, n_chunks)
+        if exclude_pages is not None:
+            own = self.pages[None, :] == np.asarray(exclude_pages, dtype=np.int64)[:, None]
+            scores[own] = -np.inf
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for row, cols in zip(scores, top):
+            cols = cols[np.argsort(-row[cols])]
+            results.append([self.texts[c] for c in cols if np.isfinite(row[c])])
+        return results
+
+    def save(self, folder):
+        # Write-then-rename: a previous version may still be memory-mapped by readers
+        os.makedirs(folder, exist_ok=True)
+        matrix_path = os.path.join(folder, "embeddings.npy")
+        meta_path = os.path.join(folder, "chunks.json")
+        with open(matrix_path + ".tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(self.matrix))
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"ids": self.ids, "texts": self.texts, "pages": self.pages.tolist()}, f)
+        os.replace(matrix_path + ".tmp", matrix_path)
+        os.replace(meta_path + ".tmp", meta_path)
+
+    @classmethod
+    def load(cls, folder):
+        matrix_path = os.path.join(folder, "embeddings.npy")
+        meta_path = os.path.join(folder, "chunks.json")
+        if not (os.path.exists(matrix_path) and os.path.exists(meta_path)):
+            return cls()
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(meta["ids"], meta["texts"], meta["pages"], np.load(matrix_path, mmap_mode="r"))
+
+def _flat_folder(doc_id):
+    return os.path.join(_persist_dir, "flat", _store_name(doc_id)) if _persist_dir else None
+
+def _flat_index(doc_id):
+    with _flat_lock:
+        if doc_id not in _flat_indexes:
+            folder = _flat_folder(doc_id)
+            _flat_indexes[doc_id] = FlatIndex.load(folder) if folder else FlatIndex()
+        return _flat_indexes[doc_id]
+
+def _chunks(ocr_data):
+    # Entries may carry sub-page windows under "chunks" (see prompt_builder.chunk_text)
+    chunks = {}
+    for i, entry in enumerate(ocr_data):
+        page = entry.get("page_number", i + 1)
+        for j, text in enumerate(entry.get("chunks") or [entry["text"]]):
+            h = _text_hash(text)
+            chunks[f"p{page}-c{j}-{h}"] = (text, {"page": page, "chunk": j, "hash": h})
+    return chunks
+
+def _embed_missing(chunks, known):
+    """
+    One embedding per distinct chunk text: taken from known (text hash ->
+    vector) when that text was embedded before, at any page or position,
+    else computed in one batch. Returns (hash -> vector, number computed).
+    """
+    missing = {}
+    for text, meta in chunks.values():
+        if meta["hash"] not in known:
+            missing.setdefault(meta["hash"], text)
+    vectors = dict(known)
+    if missing:
+        vectors.update(zip(missing, _embed(list(missing.values()))))
+    return vectors, len(missing)
+
+def _build_flat(chunks, doc_id):
+    old = _flat_index(doc_id)
+    hashes = {meta["hash"] for _, meta in chunks.values()}
+    known = {cid.rsplit("-", 1)[1]: old.matrix[row] for row, cid in enumerate(old.ids)}
+    vectors, embedded = _embed_missing(chunks, {h: v for h, v in known.items() if h in hashes})
+
+    ids = list(chunks)
+    rows = [vectors[chunks[cid][1]["hash"]] for cid in ids]
+    matrix = np.vstack(rows).astype(np.float32) if rows else np.zeros((0, 0), dtype=np.float32)
+    index = FlatIndex(ids, [chunks[c][0] for c in ids], [chunks[c][1]["page"] for c in ids], matrix)
+
+    kept = len(set(old.ids) & chunks.keys())
+    if ids != old.ids:
+        folder = _flat_folder(doc_id)
+        if folder:
+            index.save(folder)
+    with _flat_lock:
+        _flat_indexes[doc_id] = index
+    return embedded, len(ids) - embedded, len(old) - kept
+
+def _build_chroma(chunks, doc_id):
+    collection = _collection(doc_id)
+    existing = set(collection.get(include=[])["ids"])
+    stale = list(existing - chunks.keys())
+    new_ids = [cid for cid in chunks if cid not in existing]
+
+    embedded = 0
+    if new_ids:
+        # Chunks that only moved (page or position) keep the embedding stored under their old id
+        wanted = list({chunks[cid][1]["hash"] for cid in new_ids})
+        found = collection.get(where={"hash": {"$in": wanted}}, include=["embeddings", "metadatas"])
+        known = {meta["hash"]: np.asarray(vec, dtype=np.float32)
+                 for meta, vec in zip(found["metadatas"], found["embeddings"])}
+        vectors, embedded = _embed_missing({cid: chunks[cid] for cid in new_ids}, known)
+        collection.upsert(
+            ids=new_ids, documents=[chunks[cid][0] for cid in new_ids],
+            embeddings=[vectors[chunks[cid][1]["hash"]].tolist() for cid in new_ids],
+            metadatas=[chunks[cid][1] for cid in new_ids]
+        )
+    if stale:
+        collection.delete(ids=stale)
+    return embedded, len(chunks) - embedded, len(stale)
+
+def build_vector_store(ocr_data, doc_id="default"):
+    """
+    Upserts the document's page texts (or their "chunks") into its own collection.
+
+    Each chunk's page number, position and text hash are kept as metadata,
+    and embeddings are looked up by the text hash alone: re-indexing only
+    embeds text that was never embedded before, even when pages are
+    inserted or removed and unchanged chunks shift, and drops chunks that no
+    longer exist; an unchanged document costs one id lookup.
+    """
+    chunks = _chunks(ocr_data)
+    build = _build_flat if _backend == "numpy" else _build_chroma
+    embedded, reused, removed = build(chunks, doc_id)
+    logging.info(f"📚 RAG store {doc_id} ({_backend}): {embedded} embedded, "
+                 f"{reused} reused, {removed} removed")
+
+def query_similar(text, k=3, doc_id="default", exclude_page=None):
+    """Top-k chunk texts for text, optionally skipping chunks from exclude_page."""
+    return query_similar_batch([text], k, doc_id, [exclude_page])[0]
+
+def query_similar_batch(texts, k=3, doc_id="default", exclude_pages=None):
+    """
+    query_similar for many texts with one embedding call.
+
+    exclude_pages gives a page number (or None) per text, typically the
+    query page itself, whose own chunk would otherwise always rank first.
+    """
+    if not texts:
+        return []
+    exclude_pages = exclude_pages or [None] * len(texts)
+    queries = _embed(texts)
+
+    if _backend == "numpy":
+        return _flat_index(doc_id).search(
+            queries, k, [-1 if p is None else p for p in exclude_pages]
+        )
+
+    collection = _collection(doc_id)
+    count = collection.count()
+    if count == 0:
+        return [[] for _ in texts]
+    results = []
+    for query, page in zip(queries.tolist(), exclude_pages):
+        where = {"page": {"$ne": page}} if page is not None else None
+        hits = collection.query(query_embeddings=[query], n_results=min(k, count), where=where)
+        results.append(hits["documents"][0])
+    return results
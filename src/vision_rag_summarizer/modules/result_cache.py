@@ -0,0 +1,108 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from pathlib import Path
+
+from PIL import Image
+
+from vision_rag_summarizer.modules.page import Page
+
+class ResultCache:
+    """
+    Persistent SQLite cache for OCR text, captions and summaries.
+
+    Keys are content hashes (see make_key / content_digest), so a revised
+    document only misses on the pages that actually changed. The total size of
+    stored values is bounded by max_bytes with least-recently-used eviction.
+    """
+    def __init__(self, path: str = ".cache/results.sqlite", max_bytes: int = 256 * 1024 * 1024):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " size INTEGER NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)")
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()[0]
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE results SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, value: str):
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._total += size - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        while self._total > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM results ORDER BY accessed LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._total -= size
+                if self._total <= self.max_bytes:
+                    break
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._total}
+
+    def log_stats(self):
+        logging.info(f"🗃️ Cache {self.path}: {self.hits} hits, {self.misses} misses, "
+                     f"{self._total / 1e6:.1f} MB stored")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def make_key(*parts) -> str:
+    """Hashes the parts (model id, prompt template, content digest…) into one cache key."""
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+def content_digest(source) -> str:
+    """SHA-256 of page pixels (Page / PIL image), file bytes (path) or text (str)."""
+    h = hashlib.sha256()
+    if isinstance(source, Page) and source.samples is not None:
+        h.update(f"{source.width}x{source.height}:{source.stride}".encode())
+        h.update(source.samples)
+    elif isinstance(source, Page):
+        h.update(Path(source.image_path).read_bytes())
+    elif isinstance(source, Image.Image):
+        h.update(f"{source.mode}:{source.size}".encode())
+        h.update(source.tobytes())
+    elif isinstance(source, (str, os.PathLike)) and os.path.isfile(source):
+        h.update(Path(source).read_bytes())
+    else:
+        h.update(str(source).encode("utf-8"))
+    return h.hexdigest()
@@ -0,0 +1,106 @@
+import os
+import logging
+import threading
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+from vision_rag_summarizer.modules.result_cache import make_key, content_digest
+
+class SegmentStore:
+    """
+    On-disk store of encoded page segments that survives across runs.
+
+    A segment's key hashes the page image, its narration text, the TTS voice
+    and the encode settings, so after an edit only the pages whose key
+    changed are narrated and encoded again; the rest are stream-copied from
+    here. Total size is bounded by max_bytes, evicting the least recently
+    used segments. Sizes and recency are tracked in memory after one scan of
+    the directory. Segments returned by get() or put() are pinned until
+    release(), so a run's own segments can't be evicted before it has
+    concatenated them.
+    """
+    def __init__(self, root: str = ".cache/segments", max_bytes: int = 2 * 1024 ** 3):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._sizes = OrderedDict()  # key -> size, least recently used first
+        self._total = 0
+        self._pinned = Counter()
+        self._index()
+
+    def _index(self):
+        files = []
+        for f in self.root.glob("*.mp4"):
+            try:
+                st = f.stat()
+            except FileNotFoundError:  # removed by another process meanwhile
+                continue
+            files.append((st.st_mtime, f.stem, st.st_size))
+        for _, key, size in sorted(files):
+            self._sizes[key] = size
+            self._total += size
+
+    def key(self, image, text, voice, settings) -> str:
+        return make_key("segment", content_digest(image), text, voice, *settings)
+
+    def path(self, key) -> Path:
+        return self.root / f"{key}.mp4"
+
+    def get(self, key):
+        """Path of the stored segment (pinned until release), or None."""
+        path = self.path(key)
+        with self._lock:
+            if key not in self._sizes or not path.exists():
+                self._sizes.pop(key, None)
+                self.misses += 1
+                return None
+            self._sizes.move_to_end(key)
+            self._pinned[key] += 1
+            self.hits += 1
+        try:
+            os.utime(path)  # keeps recency across runs
+        except FileNotFoundError:
+            pass
+        return str(path)
+
+    def put(self, key, segment_path) -> str:
+        """Moves a freshly encoded segment into the store (pinned until release) and returns its new path."""
+        path = self.path(key)
+        size = os.path.getsize(segment_path)
+        os.replace(segment_path, path)
+        with self._lock:
+            self._total += size - self._sizes.pop(key, 0)
+            self._sizes[key] = size
+            self._pinned[key] += 1
+            self._evict()
+        return str(path)
+
+    def release(self, keys):
+        """Unpins keys from get()/put() once their segments have been concatenated."""
+        with self._lock:
+            for key in keys:
+                if key is None:
+                    continue
+                self._pinned[key] -= 1
+                if self._pinned[key] <= 0:
+                    del self._pinned[key]
+            self._evict()
+
+    def _evict(self):
+        for key in list(self._sizes):
+            if self._total <= self.max_bytes:
+                break
+            if self._pinned[key]:
+                continue
+            self._total -= self._sizes.pop(key)
+            try:
+                self.path(key).unlink()
+            except FileNotFoundError:
+                pass
+
+    def log_stats(self):
+        logging.info(f"🎬 Segment store {self.root}: {self.hits} reused, {self.misses} encoded, "
+                     f"{self._total / 1e6:.1f} MB stored")
@@ -2,9 +2,98 @@
 
 import os
 import json
+import shutil
+import logging
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont
 
+from vision_rag_summarizer.modules.video_generator import (
+    FFMPEG_EXE, STILL_FPS, STILL_IMAGE_ARGS, probe_duration, cleanup_files
+)
+
+MARGIN = 10
+LINE_GAP = 4
+
+@lru_cache(maxsize=8)
+def _font(font_path, fontsize):
+    # Loaded once per process and size, not once per slide
+    if font_path:
+        return ImageFont.truetype(font_path, fontsize)
+    return ImageFont.load_default()
+
+@lru_cache(maxsize=4096)
+def wrap_line(line, font_path, fontsize, max_width):
+    """Word-wraps one line to max_width pixels; returns a tuple of lines."""
+    font = _font(font_path, fontsize)
+    wrapped, current = [], ""
+    for word in line.split():
+        candidate = f"{current} {word}" if current else word
+        if current and font.getlength(candidate) > max_width:
+            wrapped.append(current)
+            current = word
+        else:
+            current = candidate
+    wrapped.append(current)
+    return tuple(wrapped)
+
+def read_slides(summary_path, lines_per_slide=5):
+    """Groups the non-empty lines of summary.txt into slides of lines_per_slide lines."""
+    with open(summary_path, "r", encoding="utf-8") as f:
+        lines = [l.rstrip() for l in f if l.strip()]
+    return [lines[i:i + lines_per_slide] for i in range(0, len(lines), lines_per_slide)]
+
+def render_slide(chunk_lines, slide_size=(640, 480), fontsize=24, font_path=None):
+    """Draws white text on black, wrapped to the slide width; returns a PIL image."""
+    img = Image.new("RGB", slide_size, "black")
+    draw = ImageDraw.Draw(img)
+    font = _font(font_path, fontsize)
+    y = MARGIN
+    for line in chunk_lines:
+        for part in wrap_line(line, font_path, fontsize, slide_size[0] - 2 * MARGIN):
+            draw.text((MARGIN, y), part, font=font, fill="white")
+            y += fontsize + LINE_GAP
+    return img
+
+def _render_png(args):
+    chunk_lines, slide_size, fontsize, font_path, png_path = args
+    render_slide(chunk_lines, slide_size, fontsize, font_path).save(png_path)
+    return png_path
+
+def _render_raw(args):
+    chunk_lines, slide_size, fontsize, font_path = args
+    return render_slide(chunk_lines, slide_size, fontsize, font_path).tobytes()
+
+def _map(fn, jobs, workers):
+    # Slides render independently; a process pool sidesteps the GIL during drawing
+    if workers is None:
+        workers = min(len(jobs), os.cpu_count() or 1)
+    if workers <= 1 or len(jobs) <= 1:
+        yield from map(fn, jobs)
+        return
+    # spawn: forking a process whose other threads hold locks can deadlock the children
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        yield from pool.map(fn, jobs, chunksize=max(1, len(jobs) // (workers * 4)))
+
+def frame_counts(durations, fps=STILL_FPS):
+    """
+    Frames per slide for the given durations in seconds. Every slide gets at
+    least one frame; frames added that way, and rounding, are carried
+    forward and taken from the following slides, so each slide starts within
+    a frame of its audio and the total never drifts.
+    """
+    counts, shown, end = [], 0, 0.0
+    for seconds in durations:
+        end += seconds
+        frames = max(1, round(end * fps) - shown)
+        counts.append(frames)
+        shown += frames
+    return counts
+
 def create_slide_manifest(
     summary_path: str,
     output_folder: str = "slides",
@@ -12,48 +101,31 @@ def create_slide_manifest(
     manifest_path: str = "slides/manifest.json",
     slide_size=(640, 480),
     fontsize=24,
-    font_path=None  # you can point to a .ttf if you like
+    font_path=None,  # you can point to a .ttf if you like
+    workers=None
 ):
     """
     Splits summary.txt into text & PNG slides, then writes a manifest.json of PNGs.
+    Slides are rendered in parallel (workers processes, default one per core).
     Returns list of PNG file paths.
     """
     os.makedirs(output_folder, exist_ok=True)
+    slides = read_slides(summary_path, lines_per_slide)
 
-    # Load summary lines
-    with open(summary_path, "r", encoding="utf-8") as f:
-        lines = [l.rstrip() for l in f if l.strip()]
-
-    # Prepare font
-    if font_path:
-        font = ImageFont.truetype(font_path, fontsize)
-    else:
-        font = ImageFont.load_default()
-
-    png_files = []
-
-    # Chunk into slides
-    for idx in range(0, len(lines), lines_per_slide):
-        chunk_lines = lines[idx : idx + lines_per_slide]
-        slide_num = idx // lines_per_slide + 1
+    jobs = []
+    for slide_num, chunk_lines in enumerate(slides, start=1):
         num_str = f"{slide_num:03d}"
-        
+
         # 1) write the .txt (optional)
         txt_path = Path(output_folder) / f"slide_{num_str}.txt"
         with open(txt_path, "w", encoding="utf-8") as sf:
             sf.write("\n".join(chunk_lines))
 
-        # 2) render the PNG
-        img = Image.new("RGB", slide_size, "black")
-        draw = ImageDraw.Draw(img)
-        y = 10
-        for line in chunk_lines:
-            draw.text((10, y), line, font=font, fill="white")
-            y += fontsize + 4
-
         png_path = Path(output_folder) / f"slide_{num_str}.png"
-        img.save(png_path)
-        png_files.append(str(png_path))
+        jobs.append((chunk_lines, tuple(slide_size), fontsize, font_path, str(png_path)))
+
+    # 2) render the PNGs
+    png_files = list(_map(_render_png, jobs, workers))
 
     # 3) write manifest of PNGs
     manifest = {"slides": png_files}
@@ -61,3 +133,94 @@ def create_slide_manifest(
         json.dump(manifest, mf, indent=2)
 
     return png_files
+
+def render_slides_video(
+    summary_path: str,
+    output_path: str = "videos/summary_video.mp4",
+    lines_per_slide: int = 5,
+    slide_size=(640, 480),
+    fontsize=24,
+    font_path=None,
+    narrator=None,
+    seconds_per_slide: float = 5.0,
+    manifest_path: str = None,
+    work_dir: str = None,
+    workers=None
+):
+    """
+    Renders the slides straight into the encoder: frames go to ffmpeg's stdin
+    as raw RGB, with no PNG written or decoded.
+
+    With a narrator (tts.Narrator) each slide is narrated and stays up for
+    its audio's duration; otherwise every slide lasts seconds_per_slide and
+    the video is silent. manifest_path, if given, records each slide's text,
+    start and duration as JSON metadata. Narration is written to work_dir
+    (default: a temporary directory) and removed afterwards, also on failure.
+    """
+    slides = read_slides(summary_path, lines_per_slide)
+    if not slides:
+        raise ValueError("Summary text is empty.")
+    width, height = (slide_size[0] // 2) * 2, (slide_size[1] // 2) * 2
+
+    own_work_dir = work_dir is None
+    if own_work_dir:
+        work_dir = tempfile.mkdtemp(prefix="slides_")
+    audio_files = []
+    audio_list = os.path.join(work_dir, 'slides_audio.txt')
+    try:
+        if narrator is not None:
+            audio_files = narrator.synthesize_many([
+                (" ".join(lines), os.path.join(work_dir, f"slide_{i:03d}.{narrator.extension}"))
+                for i, lines in enumerate(slides, start=1)
+            ])
+            durations = [probe_duration(path) for path in audio_files]
+        else:
+            durations = [seconds_per_slide] * len(slides)
+
+        cmd = [
+            FFMPEG_EXE, '-y',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}',
+            '-framerate', str(STILL_FPS), '-i', 'pipe:0',
+        ]
+        if audio_files:
+            with open(audio_list, 'w', encoding='utf-8') as f:
+                f.write("ffconcat version 1.0\n")
+                for path in audio_files:
+                    f.write(f"file '{os.path.abspath(path)}'\n")
+            cmd += ['-f', 'concat', '-safe', '0', '-i', audio_list, '-map', '0:v', '-map', '1:a', '-shortest']
+        else:
+            cmd += ['-an']
+        cmd += [*STILL_IMAGE_ARGS, str(output_path)]
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        logging.info(f"🎞️ Streaming {len(slides)} slides into {output_path}…")
+        encoder = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        try:
+            jobs = [(lines, (width, height), fontsize, font_path) for lines in slides]
+            for frame, frames in zip(_map(_render_raw, jobs, workers), frame_counts(durations)):
+                # A still slide is the same frame repeated for its duration
+                for _ in range(frames):
+                    encoder.stdin.write(frame)
+        finally:
+            encoder.stdin.close()
+            returncode = encoder.wait()
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd)
+    finally:
+        if own_work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+        else:
+            cleanup_files([path for path in audio_files + [audio_list] if os.path.exists(path)])
+
+    if manifest_path:
+        start, entries = 0.0, []
+        for i, (lines, seconds) in enumerate(zip(slides, durations), start=1):
+            entries.append({"slide": i, "text": "\n".join(lines), "start": round(start, 3),
+                            "duration": round(seconds, 3)})
+            start += seconds
+        os.makedirs(os.path.dirname(os.path.abspath(manifest_path)), exist_ok=True)
+        with open(manifest_path, "w", encoding="utf-8") as mf:
+            json.dump({"video": str(output_path), "slides": entries}, mf, indent=2)
+
+    logging.info(f"✅ Video saved to {output_path}")
+    return output_path
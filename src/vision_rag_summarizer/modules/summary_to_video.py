@@ -1,32 +1,53 @@
 import os
-from TTS.api import TTS
-from moviepy.editor import ImageClip, AudioFileClip
+import re
 
-def generate_narrated_video(summary_file: str, image_folder: str, output_path: str = "summary_video.mp4"):
+from vision_rag_summarizer.modules.tts import get_narrator
+from vision_rag_summarizer.modules.video_generator import parse_summaries, render_timeline, cleanup_files
+
+def split_sentences(text):
+    return [s for s in re.split(r'(?<=[.!?])\s+', text.strip()) if s]
+
+def generate_narrated_video(summary_file: str, image_folder: str, output_path: str = "summary_video.mp4",
+                            narrator=None, work_dir: str = ".", tts_workers: int = 4):
+    # narrator: tts.Narrator; by default the offline Coqui model, loaded once per process
+    # The summary is narrated sentence by sentence and each sentence's audio
+    # decides how long its image stays up: with "--- Page N ---" sections the
+    # image is page_N.png, otherwise the first image shows throughout. ffmpeg
+    # renders the still images directly (render_timeline), without per-frame work.
     print("[*] Reading summary text...")
-    with open(summary_file, "r") as f:
+    with open(summary_file, "r", encoding="utf-8") as f:
         summary = f.read()
 
     if not summary.strip():
         raise ValueError("Summary text is empty.")
 
-    print("[*] Generating TTS audio...")
-    tts = TTS(model_name="tts_models/en/ljspeech/tacotron2-DDC", progress_bar=False)
-    tts.tts_to_file(text=summary, file_path="summary.wav")
-
-    print("[*] Locating image for video...")
+    print("[*] Locating images for video...")
     image_files = sorted([f for f in os.listdir(image_folder) if f.endswith(".png")])
     if not image_files:
         raise FileNotFoundError("No images found in image folder.")
-
     first_image = os.path.join(image_folder, image_files[0])
-    audio = AudioFileClip("summary.wav")
 
-    print("[*] Creating video...")
-    video_clip = ImageClip(first_image).set_duration(audio.duration).set_audio(audio)
-    video_clip = video_clip.set_fps(24)
+    sections = parse_summaries(summary_file) or {None: summary}
+    sentences = []  # (image, text)
+    image = first_image
+    for page_num, text in sorted(sections.items(), key=lambda item: item[0] or 0):
+        page_image = os.path.join(image_folder, f"page_{page_num}.png")
+        if os.path.exists(page_image):
+            image = page_image
+        sentences += [(image, sentence) for sentence in split_sentences(text)]
+    if not sentences:
+        raise ValueError("Summary text is empty.")
+
+    print(f"[*] Generating TTS audio for {len(sentences)} sentences...")
+    narrator = narrator or get_narrator("coqui")
+    audio_files = narrator.synthesize_many(
+        [(text, os.path.join(work_dir, f"summary_{i}.wav")) for i, (_, text) in enumerate(sentences)],
+        workers=tts_workers
+    )
 
     print("[*] Writing video to disk...")
-    video_clip.write_videofile(output_path, codec="libx264", audio_codec="aac")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    render_timeline([(image, audio) for (image, _), audio in zip(sentences, audio_files)], output_path, work_dir)
+    cleanup_files(audio_files)
 
     print(f"[✓] Video created: {output_path}")
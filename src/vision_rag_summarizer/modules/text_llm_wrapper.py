@@ -1,45 +1,355 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoTokenizer, AutoModelForCausalLM, DynamicCache
 import torch
+import copy
 import logging
-import platform
+import threading
+from collections import OrderedDict
 from pathlib import Path
 
+from vision_rag_summarizer.modules.result_cache import make_key
+from vision_rag_summarizer.modules.quantization import check_mode, load_quantized
+from vision_rag_summarizer.modules.model_registry import detect_device
+from vision_rag_summarizer.utils.batch_queue import BatchQueue
+from vision_rag_summarizer.utils.stopping import cancel_criteria, was_cancelled
+
+def summary_cache_key(model_id: str, prompt: str) -> str:
+    """ResultCache key of a summary; shared with LlmPool, which caches for its replicas."""
+    return make_key("llm", model_id, 150, "greedy", prompt)
+
+class PrefixKvCache:
+    """
+    Bounded LRU of past-key-values for prompt prefixes (the fixed prompt
+    header, frequently retrieved RAG context), keyed by the prefix text.
+    """
+    def __init__(self, max_entries: int = 8):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, prefix: str):
+        with self._lock:
+            entry = self._entries.get(prefix)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(prefix)
+            # generate() extends the cache in place, so every caller gets a copy
+            ids, past = entry
+            return ids, copy.deepcopy(past)
+
+    def longest_base(self, prefix: str):
+        """(text, ids, past copy) of the longest cached proper prefix of `prefix`, or None."""
+        with self._lock:
+            bases = [text for text in self._entries if prefix.startswith(text) and text != prefix]
+            if not bases:
+                return None
+            base = max(bases, key=len)
+            self._entries.move_to_end(base)
+            ids, past = self._entries[base]
+            return base, ids, copy.deepcopy(past)
+
+    def put(self, prefix: str, ids, past):
+        with self._lock:
+            self._entries[prefix] = (ids, past)
+            self._entries.move_to_end(prefix)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+DECODING_MODES = ("greedy", "prompt_lookup", "assisted")
+
 class TextLlmWrapper:
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, cache=None, prefix_cache_size: int = 8,
+                 decoding: str = "greedy", draft_model_path: str = None, lookup_tokens: int = 10,
+                 quantize: str = None):
+        """
+        :param quantize: None (float32 on CPU), "int8" (dynamic int8 Linear
+            layers, CPU only) or "bf16"; int8 weights are saved under
+            .cache/quantized and reused on later starts
+        :param decoding: "greedy" (default), "prompt_lookup" (drafts copied from
+            n-grams of the prompt, e.g. the OCR text) or "assisted" (drafts from a
+            small model at draft_model_path sharing the tokenizer). Both
+            speculative modes verify drafts with the main model, so the output
+            matches greedy decoding; they run one prompt at a time.
+        """
+        if decoding not in DECODING_MODES:
+            raise ValueError(f"Unknown decoding mode: {decoding} (expected one of {DECODING_MODES})")
+        if decoding == "assisted" and not draft_model_path:
+            raise ValueError("decoding='assisted' needs draft_model_path")
+        self.decoding = decoding
+        self.lookup_tokens = lookup_tokens
         model_dir = Path(model_path)
+        self.model_id = str(model_dir.resolve())
+        self.cache = cache  # optional ResultCache for summaries
+        self.prefix_cache = PrefixKvCache(prefix_cache_size) if prefix_cache_size else None
         if not model_dir.is_dir():
             raise FileNotFoundError(f"Model directory not found: {model_dir.resolve()}")
 
-        # Device auto-select: prefer CUDA, then MPS on macOS >=14, else CPU
-        system = platform.system()
-        if torch.cuda.is_available():
-            self.device = torch.device("cuda")
-        elif system == "Darwin" and torch.backends.mps.is_available() and platform.mac_ver()[0] >= "14.0":
-            self.device = torch.device("mps")
-        else:
-            self.device = torch.device("cpu")
+        self.device = detect_device()
 
         logging.info(f"🧠 Text LLM running on device: {self.device}")
 
+        self.quantize = check_mode(quantize, self.device)
+        if self.quantize:
+            # Different weights give different summaries; keep their cache entries apart
+            self.model_id += f"+{self.quantize}"
+
         self.tokenizer = AutoTokenizer.from_pretrained(model_dir, local_files_only=True)
-        self.model = AutoModelForCausalLM.from_pretrained(
+        self.model = load_quantized(model_dir, self.quantize, lambda: AutoModelForCausalLM.from_pretrained(
             model_dir,
             torch_dtype=torch.float16 if self.device.type == "cuda" else torch.float32,
-            local_files_only=True
-        ).to(self.device)
+            local_files_only=True,
+            low_cpu_mem_usage=True  # memory-maps safetensors instead of init-then-copy
+        ), model_cls=AutoModelForCausalLM).to(self.device)
         self.model.eval()
 
+        self.draft_model = None
+        if decoding == "assisted":
+            self.draft_model = AutoModelForCausalLM.from_pretrained(
+                Path(draft_model_path),
+                torch_dtype=self.model.dtype,
+                local_files_only=True,
+                low_cpu_mem_usage=True
+            ).to(self.device)
+            self.draft_model.eval()
+
+        # Count main-model forward passes per thread for speculative acceptance stats
+        self._forward_count = threading.local()
+        self.model.register_forward_hook(self._count_forward)
+
+        # Batched generation pads on the left so every row ends at the prompt's last token
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
         logging.info("✅ Text LLM loaded successfully")
 
-    def run(self, prompt: str) -> str:
+    def _count_forward(self, module, args, output):
+        self._forward_count.n = getattr(self._forward_count, "n", 0) + 1
+
+    def _speculative_kwargs(self) -> dict:
+        if self.decoding == "prompt_lookup":
+            return {"prompt_lookup_num_tokens": self.lookup_tokens}
+        if self.decoding == "assisted":
+            return {"assistant_model": self.draft_model}
+        return {}
+
+    def _log_acceptance(self, new_tokens: int):
+        forwards = getattr(self._forward_count, "n", 0)
+        if self.decoding == "greedy" or not forwards or not new_tokens:
+            return
+        # Each verification pass yields one token of its own plus the accepted drafts
+        accepted = max(0, new_tokens - forwards)
+        logging.info(f"🎯 {self.decoding}: {new_tokens} tokens in {forwards} forward passes, "
+                     f"{accepted} draft tokens accepted ({new_tokens / forwards:.2f} tokens/step)")
+
+    def _cache_key(self, prompt: str) -> str:
+        return summary_cache_key(self.model_id, prompt)
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.tokenizer(text, add_special_tokens=False).input_ids)
+
+    @staticmethod
+    def _prefix_chain(prefix) -> tuple:
+        # A prefix is one string or nested strings, shortest first (see prompt_builder.build_prompt)
+        if not prefix:
+            return ()
+        return (prefix,) if isinstance(prefix, str) else tuple(p for p in prefix if p)
+
+    def _uses_prefix_cache(self) -> bool:
+        # Speculative decoding manages its own cache; MPS can't move cached tensors reliably
+        return self.prefix_cache is not None and self.decoding == "greedy" and self.device.type != "mps"
+
+    def _prefix_past(self, prefix: str):
+        """
+        (token ids, past-key-values) for `prefix`, tokenized on its own like
+        a whole prompt. On a miss it is built from the longest cached shorter
+        prefix (e.g. the fixed header) when that prefix's ids are a leading
+        part of its ids, so only the new tokens are prefilled; otherwise the
+        whole prefix is.
+        """
+        cached = self.prefix_cache.get(prefix)
+        if cached is not None:
+            return cached
+        ids = self.tokenizer(prefix).input_ids
+        new_ids, past = ids, None
+        base = self.prefix_cache.longest_base(prefix)
+        if base is not None:
+            _, base_ids, base_past = base
+            if len(base_ids) < len(ids) and ids[:len(base_ids)] == list(base_ids):
+                new_ids, past = ids[len(base_ids):], base_past
+        with torch.no_grad():
+            past = self.model(
+                input_ids=torch.tensor([new_ids], device=self.device), past_key_values=past, use_cache=True
+            ).past_key_values
+        self.prefix_cache.put(prefix, ids, past)
+        return ids, copy.deepcopy(past)
+
+    @staticmethod
+    def _expand_past(past, n: int):
+        # The cached prefix was computed for one row; every row of the batch shares it
+        if n == 1:
+            return past
+        legacy = past.to_legacy_cache() if hasattr(past, "to_legacy_cache") else past
+        expanded = tuple(
+            (k.expand(n, *k.shape[1:]).contiguous(), v.expand(n, *v.shape[1:]).contiguous())
+            for k, v in legacy
+        )
+        return DynamicCache.from_legacy_cache(expanded) if hasattr(past, "to_legacy_cache") else expanded
+
+    def _generate_with_prefix(self, prompts: list, prefix: str, cancel_tokens: list):
+        """
+        Greedy generation for prompts that all start with `prefix`, resuming
+        from its cached KV state. Rows are laid out as prefix | padding | rest:
+        the padding sits after the shared prefix, and since positions follow
+        the attention mask, each row's own text continues at the right position.
+
+        Each prompt is tokenized whole and split at the prefix's token
+        boundary, so the model sees exactly the tokens of a plain prefill and
+        the output doesn't depend on which prompts share the batch. Returns
+        None when some prompt's tokens don't start with the prefix's (a
+        token spanning the boundary); the caller then prefills in full.
+        """
+        prefix_ids, past = self._prefix_past(prefix)
+        rests = []
+        for prompt in prompts:
+            ids = self.tokenizer(prompt).input_ids
+            if len(ids) <= len(prefix_ids) or ids[:len(prefix_ids)] != list(prefix_ids):
+                return None
+            rests.append(ids[len(prefix_ids):])
+        width = max(len(r) for r in rests)
+        pad = self.tokenizer.pad_token_id
+        input_ids = [prefix_ids + [pad] * (width - len(r)) + r for r in rests]
+        mask = [[1] * len(prefix_ids) + [0] * (width - len(r)) + [1] * len(r) for r in rests]
+        with torch.no_grad():
+            out = self.model.generate(
+                input_ids=torch.tensor(input_ids, device=self.device),
+                attention_mask=torch.tensor(mask, device=self.device),
+                past_key_values=self._expand_past(past, len(prompts)),
+                max_new_tokens=150, do_sample=False, pad_token_id=pad,
+                stopping_criteria=cancel_criteria(cancel_tokens)
+            )
+        return self.tokenizer.batch_decode(out, skip_special_tokens=True)
+
+    def run(self, prompt: str, cancel_token=None, prefix=None) -> str:
+        # cancel_token (utils.time_out.CancellationToken) stops generation early;
+        # the text produced so far is returned and not cached.
+        # prefix: leading part of prompt shared with other pages (or nested
+        # prefixes, shortest first); its KV cache is kept in prefix_cache and
+        # generation resumes after it
         try:
-            inputs = self.tokenizer(prompt, return_tensors="pt")
-            if self.device.type != "mps":
-                inputs = inputs.to(self.device)
+            key = None
+            if self.cache is not None:
+                key = self._cache_key(prompt)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    return cached
+
+            text = None
+            chain = [p for p in self._prefix_chain(prefix) if prompt.startswith(p) and p != prompt]
+            if chain and self._uses_prefix_cache():
+                texts = self._generate_with_prefix([prompt], chain[-1], [cancel_token])
+                text = texts[0] if texts is not None else None
+            if text is None:
+                inputs = self.tokenizer(prompt, return_tensors="pt")
+                if self.device.type != "mps":
+                    inputs = inputs.to(self.device)
 
-            with torch.no_grad():
-                out = self.model.generate(**inputs, max_new_tokens=150, do_sample=False)
-            return self.tokenizer.decode(out[0], skip_special_tokens=True)
+                self._forward_count.n = 0
+                with torch.no_grad():
+                    out = self.model.generate(
+                        **inputs, max_new_tokens=150, do_sample=False,
+                        stopping_criteria=cancel_criteria([cancel_token]),
+                        **self._speculative_kwargs()
+                    )
+                self._log_acceptance(out.shape[1] - inputs["input_ids"].shape[1])
+                text = self.tokenizer.decode(out[0], skip_special_tokens=True)
+            if key is not None and not was_cancelled(cancel_token):
+                self.cache.put(key, text)
+            return text
         except Exception as e:
             logging.error(f"❌ Text LLM failed: {e}")
-            return "[Error]"
\ No newline at end of file
+            return "[Error]"
+
+    def run_batch(self, prompts: list, cancel_tokens=None) -> list:
+        """
+        Greedy generation for several prompts in one generate call.
+
+        cancel_tokens holds an optional CancellationToken per prompt; a cancelled
+        row stops while the rest of the batch keeps generating. Items may be
+        (prompt, prefix) pairs, prefix being a string or nested prefixes: the
+        longest prefix every row shares (at least the fixed prompt header) is
+        taken from the prefix KV cache for the whole batch. Batches without a
+        common prefix are left-padded and prefilled in full.
+        """
+        cancel_tokens = cancel_tokens or [None] * len(prompts)
+        pairs = [p if isinstance(p, tuple) else (p, None) for p in prompts]
+        if len(pairs) == 1 or self.decoding != "greedy":
+            # Speculative decoding only supports one sequence per generate call
+            return [self.run(prompt, token, prefix=prefix)
+                    for (prompt, prefix), token in zip(pairs, cancel_tokens)]
+        prompts = [prompt for prompt, _ in pairs]
+        results = [None] * len(prompts)
+        keys = [None] * len(prompts)
+        todo = []
+        for i, prompt in enumerate(prompts):
+            if self.cache is not None:
+                keys[i] = self._cache_key(prompt)
+                results[i] = self.cache.get(keys[i])
+            if results[i] is None:
+                todo.append(i)
+        if not todo:
+            return results
+
+        shared = None
+        if self._uses_prefix_cache():
+            chains = [self._prefix_chain(pairs[i][1]) for i in todo]
+            common = [p for p in chains[0] if all(p in chain for chain in chains[1:])]
+            if common and all(prompts[i].startswith(common[-1]) and prompts[i] != common[-1] for i in todo):
+                shared = common[-1]
+
+        try:
+            texts = None
+            if shared is not None:
+                texts = self._generate_with_prefix(
+                    [prompts[i] for i in todo], shared, [cancel_tokens[i] for i in todo]
+                )
+            if texts is None:
+                inputs = self.tokenizer([prompts[i] for i in todo], return_tensors="pt", padding=True)
+                if self.device.type != "mps":
+                    inputs = inputs.to(self.device)
+
+                with torch.no_grad():
+                    out = self.model.generate(
+                        **inputs, max_new_tokens=150, do_sample=False,
+                        pad_token_id=self.tokenizer.pad_token_id,
+                        stopping_criteria=cancel_criteria([cancel_tokens[i] for i in todo])
+                    )
+                texts = self.tokenizer.batch_decode(out, skip_special_tokens=True)
+        except Exception as e:
+            logging.error(f"❌ Text LLM failed for batch of {len(todo)} prompts: {e}")
+            texts = ["[Error]"] * len(todo)
+
+        for i, text in zip(todo, texts):
+            results[i] = text
+            if keys[i] is not None and text != "[Error]" and not was_cancelled(cancel_tokens[i]):
+                self.cache.put(keys[i], text)
+        return results
+
+    def batcher(self, max_batch_size: int = 8, max_wait: float = 0.05) -> BatchQueue:
+        """
+        Request queue in front of run_batch: submit(prompt) returns a Future.
+
+        Prompts arriving within max_wait of each other are grouped, sorted by
+        token length and generated together up to max_batch_size per call.
+        Futures carry a cancel_token, so utils.time_out.wait_with_timeout can
+        stop a prompt that is already generating. Submit (prompt, prefix) to use
+        the prefix KV cache; batched rows share their longest common prefix.
+        """
+        return BatchQueue(
+            self.run_batch, max_batch_size=max_batch_size, max_wait=max_wait,
+            sort_key=lambda item: self.count_tokens(item[0] if isinstance(item, tuple) else item),
+            cancellable=True, name="text-llm-batcher"
+        )
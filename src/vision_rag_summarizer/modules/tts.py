@@ -0,0 +1,284 @@
+import os
+import uuid
+import socket
+import shutil
+import logging
+import subprocess
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import imageio_ffmpeg
+
+from vision_rag_summarizer.modules.result_cache import make_key
+
+# bundled ffmpeg path
+FFMPEG_EXE = imageio_ffmpeg.get_ffmpeg_exe()
+
+COQUI_MODEL = "tts_models/en/ljspeech/tacotron2-DDC"
+
+class GttsEngine:
+    """Google Translate TTS; needs network access, one HTTP call per text."""
+    extension = "mp3"
+    sample_rate = 24000
+    thread_safe = True
+    host = "translate.google.com"
+
+    def __init__(self, lang="en"):
+        self.lang = lang
+        self.voice = f"gtts:{lang}"
+
+    def load(self):
+        # Fail at start-up rather than on the first page's narration
+        try:
+            socket.create_connection((self.host, 443), timeout=5).close()
+        except OSError as e:
+            raise RuntimeError(
+                f"gTTS needs network access to {self.host} ({e}); "
+                f"use the offline 'pyttsx3' or 'coqui' engine instead"
+            ) from e
+
+    def synthesize(self, text, path):
+        from gtts import gTTS
+        gTTS(text, lang=self.lang).save(path)
+
+class CoquiEngine:
+    """Offline Coqui TTS model, loaded once on first use."""
+    extension = "wav"
+    sample_rate = 22050
+    thread_safe = False
+
+    def __init__(self, model_name=COQUI_MODEL):
+        self.model_name = model_name
+        self.voice = f"coqui:{model_name}"
+        self._tts = None
+
+    def load(self):
+        if self._tts is None:
+            from TTS.api import TTS
+            self._tts = TTS(model_name=self.model_name, progress_bar=False)
+
+    def synthesize(self, text, path):
+        self.load()
+        self._tts.tts_to_file(text=text, file_path=path)
+
+class Pyttsx3Engine:
+    """Offline system voices (eSpeak, SAPI5, NSSpeech) through pyttsx3."""
+    extension = "wav"
+    sample_rate = 22050
+    thread_safe = False
+
+    def __init__(self, voice_id=None, rate=None):
+        self.voice_id = voice_id
+        self.rate = rate
+        self.voice = f"pyttsx3:{voice_id or 'default'}:{rate or 'default'}"
+        self._engine = None
+
+    def load(self):
+        if self._engine is None:
+            import pyttsx3
+            try:
+                self._engine = pyttsx3.init()
+            except Exception as e:  # e.g. no eSpeak installed on Linux
+                raise RuntimeError(f"pyttsx3 found no speech driver ({e}); install espeak-ng or use 'coqui'") from e
+            if self.voice_id:
+                self._engine.setProperty("voice", self.voice_id)
+            if self.rate:
+                self._engine.setProperty("rate", self.rate)
+
+    def synthesize(self, text, path):
+        self.load()
+        self._engine.save_to_file(text, path)
+        self._engine.runAndWait()
+
+ENGINES = {"gtts": GttsEngine, "coqui": CoquiEngine, "pyttsx3": Pyttsx3Engine}
+
+def make_engine(name="pyttsx3", **options):
+    if name not in ENGINES:
+        raise ValueError(f"Unknown TTS engine: {name} (expected one of {tuple(ENGINES)})")
+    return ENGINES[name](**options)
+
+# Per-process engine for Narrator(processes=N)
+_worker_engine = None
+
+def _init_worker(name, options):
+    global _worker_engine
+    _worker_engine = make_engine(name, **options)
+    _worker_engine.load()
+
+def _worker_synthesize(text, path):
+    _worker_engine.synthesize(text, path)
+    return path
+
+def _worker_ready():
+    return _worker_engine is not None
+
+def default_tts_processes():
+    # Offline engines are CPU-bound and single-threaded per instance
+    return min(4, os.cpu_count() or 1)
+
+def write_silence(path, seconds=0.5, sample_rate=24000):
+    """Mono silence in the format implied by path's extension."""
+    subprocess.run([
+        FFMPEG_EXE, '-y',
+        '-f', 'lavfi', '-i',
+        f'anullsrc=channel_layout=mono:sample_rate={sample_rate}',
+        '-t', str(seconds),
+        str(path)
+    ], check=True, capture_output=True)
+    return path
+
+class Narrator:
+    """
+    Text → audio file through one TTS engine, with an on-disk audio cache.
+
+    The engine is created and loaded up front, so a missing voice or network
+    fails before any work is done. Engines that are not thread-safe (Coqui,
+    pyttsx3) run in a spawned process pool of `processes` workers (default
+    default_tts_processes()), each loading the engine once, so narration
+    runs in parallel; with processes=1 one dedicated thread creates and
+    drives the engine, since pyttsx3's macOS and Windows drivers must be
+    used from the thread that created them.
+    Audio is cached under cache_dir by (text, voice), so identical narration
+    is never synthesized twice; callers get their own copy (hard link) of the
+    cached file and may delete it. The cache is bounded by max_bytes, evicting
+    the least recently used files. Empty text becomes 0.5 s of silence in the
+    engine's format, so all of a narrator's files can be concatenated as-is.
+    """
+    def __init__(self, engine="pyttsx3", cache_dir=".cache/tts", processes=None, max_bytes=512 * 1024 ** 2,
+                 **engine_options):
+        self.engine = make_engine(engine, **engine_options)
+        self.voice = self.engine.voice
+        self.extension = self.engine.extension
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._sizes = OrderedDict()  # cached file name -> size, least recently used first
+        self._total = 0
+        if self.cache_dir:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._index()
+        self._pool = None
+        self._engine_thread = None
+        processes = default_tts_processes() if processes is None else processes
+        if self.engine.thread_safe:
+            self.engine.load()
+        elif processes > 1:
+            self._pool = ProcessPoolExecutor(
+                max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker, initargs=(engine, engine_options)
+            )
+            try:
+                self._pool.submit(_worker_ready).result()
+            except BrokenProcessPool as e:
+                self._pool.shutdown(cancel_futures=True)
+                raise RuntimeError(f"TTS engine '{engine}' failed to load in its worker processes "
+                                   f"(see the worker's traceback above)") from e
+        else:
+            self._engine_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-engine")
+            self._engine_thread.submit(self.engine.load).result()
+
+    def _index(self):
+        # One scan at start-up; afterwards the index is kept in memory
+        files = []
+        for f in self.cache_dir.glob(f"*.{self.extension}"):
+            try:
+                st = f.stat()
+            except FileNotFoundError:
+                continue
+            files.append((st.st_mtime, f.name, st.st_size))
+        for _, name, size in sorted(files):
+            self._sizes[name] = size
+            self._total += size
+
+    def _touch(self, cached):
+        with self._lock:
+            if cached.name in self._sizes:
+                self._sizes.move_to_end(cached.name)
+                return
+        try:
+            size = cached.stat().st_size
+        except FileNotFoundError:
+            return
+        with self._lock:
+            self._sizes[cached.name] = size
+            self._total += size
+            while self._total > self.max_bytes and len(self._sizes) > 1:
+                name, old = self._sizes.popitem(last=False)
+                self._total -= old
+                try:
+                    os.unlink(self.cache_dir / name)
+                except FileNotFoundError:
+                    pass
+
+    def _run(self, text, path):
+        if self._pool is not None:
+            self._pool.submit(_worker_synthesize, text, str(path)).result()
+        elif self._engine_thread is not None:
+            self._engine_thread.submit(self.engine.synthesize, text, str(path)).result()
+        else:
+            self.engine.synthesize(text, str(path))
+
+    def synthesize(self, text, out_path) -> str:
+        """Writes narration for text and returns its path (out_path with the engine's extension)."""
+        out_path = Path(out_path).with_suffix(f".{self.extension}")
+        text = (text or "").strip()
+        if not text:
+            return str(write_silence(out_path, sample_rate=self.engine.sample_rate))
+        if self.cache_dir is None:
+            self._run(text, out_path)
+            return str(out_path)
+
+        cached = self.cache_dir / f"{make_key('tts', self.voice, text)}.{self.extension}"
+        try:
+            _link(cached, out_path)
+            self.hits += 1
+        except FileNotFoundError:
+            self.misses += 1
+            tmp = cached.with_name(f"{cached.stem}.{uuid.uuid4().hex[:8]}.tmp.{self.extension}")
+            self._run(text, tmp)
+            os.replace(tmp, cached)
+            _link(cached, out_path)
+        self._touch(cached)
+        return str(out_path)
+
+    def synthesize_many(self, items, workers=4) -> list:
+        """synthesize() for [(text, out_path), ...] on a thread pool; paths in input order."""
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tts") as pool:
+            return list(pool.map(lambda item: self.synthesize(*item), items))
+
+    def log_stats(self):
+        logging.info(f"🔊 TTS {self.voice}: {self.hits} cached, {self.misses} synthesized, "
+                     f"{self._total / 1e6:.1f} MB stored")
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+        if self._engine_thread is not None:
+            self._engine_thread.shutdown()
+
+def _link(src, dst):
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+    try:
+        os.link(src, dst)
+    except OSError:  # other filesystem, or links unsupported
+        shutil.copyfile(src, dst)
+
+_narrators = {}
+_narrators_lock = threading.Lock()
+
+def get_narrator(engine="pyttsx3", **options) -> Narrator:
+    """Shared Narrator per engine and options, so each engine loads once per process."""
+    key = (engine, tuple(sorted(options.items())))
+    with _narrators_lock:
+        if key not in _narrators:
+            _narrators[key] = Narrator(engine, **options)
+        return _narrators[key]
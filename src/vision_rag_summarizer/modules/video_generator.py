@@ -2,29 +2,197 @@ import os
 import logging
 import subprocess
 import re
+import wave
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from gtts import gTTS
-import imageio_ffmpeg  
+from PIL import Image
+import imageio_ffmpeg
+
+from vision_rag_summarizer.modules.tts import get_narrator
 
 # bundled ffmpeg path
 FFMPEG_EXE = imageio_ffmpeg.get_ffmpeg_exe()
 
-def generate_video_from_pages(
-    images_folder: str = "images",
-    summary_path: str = "summary.txt",
-    output_path: str = "videos/summary_video.mp4"
-):
-    # 1) Load summaries into a dict: { page_num: text }
+# A page is one still image: a couple of frames per second is enough, and
+# -tune stillimage spends the bits on the single picture. Every segment starts
+# on a keyframe and shares fps, timescale and audio format, so they can be
+# concatenated by stream copy.
+STILL_FPS = 2
+STILL_IMAGE_ARGS = [
+    '-c:v', 'libx264', '-preset', 'veryfast', '-tune', 'stillimage',
+    '-r', str(STILL_FPS), '-force_key_frames', '0', '-pix_fmt', 'yuv420p',
+    '-video_track_timescale', '90000',
+    '-c:a', 'aac', '-ar', '44100', '-ac', '2',
+]
+
+SCALE_EVEN = 'scale=trunc(iw/2)*2:trunc(ih/2)*2'
+# Everything besides the image, text and voice that decides a segment's bytes (SegmentStore keys)
+SEGMENT_SETTINGS = (STILL_FPS, SCALE_EVEN, *STILL_IMAGE_ARGS)
+
+VIDEO_MODES = ("segments", "timeline")
+
+def default_encode_workers():
+    return max(1, min(4, (os.cpu_count() or 1) // 2))
+
+def parse_summaries(summary_path):
+    """Loads summary.txt into a dict: { page_num: text }"""
     raw = Path(summary_path).read_text(encoding='utf-8')
     parts = re.split(r'^--- Page (\d+) ---$', raw, flags=re.MULTILINE)
     summaries = {}
     for i in range(1, len(parts), 2):
         num = int(parts[i])
         summaries[num] = parts[i+1].strip()
+    return summaries
+
+def make_page_audio(page_num, text, audio_path, narrator=None):
+    """
+    Narrates text (default narrator: cached pyttsx3), or writes a brief silent
+    placeholder if there is none so the slide still appears. Returns the
+    audio path, whose extension follows the narrator's engine.
+    """
+    narrator = narrator or get_narrator()
+    if text:
+        logging.info(f"🔊 Generating audio for page {page_num}…")
+    return narrator.synthesize(text, audio_path)
+
+def encode_segment(img_path, audio_path, segment_path, threads=0):
+    """
+    Encodes one still page image plus its narration into an MP4 segment.
+
+    :param threads: x264 threads (0 = auto); lower it when several segments
+        are encoded at once
+    """
+    cmd = [
+        FFMPEG_EXE, '-y',
+        '-framerate', str(STILL_FPS), '-loop', '1',
+        '-i', str(img_path),
+        '-i', str(audio_path),
+        '-vf', SCALE_EVEN,
+        *STILL_IMAGE_ARGS,
+        '-threads', str(threads),
+        '-shortest',
+        str(segment_path)
+    ]
+    logging.info(f"🔨 Creating segment {segment_path}")
+    subprocess.run(cmd, check=True)
+    return segment_path
+
+def concat_segments(segments, output_path, list_file='segments.txt'):
+    """Stitches the segments together by stream copy."""
+    with open(list_file, 'w', encoding='utf-8') as lf:
+        for seg in segments:
+            lf.write(f"file '{os.path.abspath(seg)}'\n")
+
+    logging.info(f"🔗 Concatenating {len(segments)} segments…")
+    subprocess.run([
+        FFMPEG_EXE, '-y',
+        '-f', 'concat', '-safe', '0',
+        '-i', list_file,
+        '-c', 'copy',
+        output_path
+    ], check=True)
+    logging.info(f"✅ Final video saved to {output_path}")
+    return output_path
+
+def probe_duration(media_path):
+    """Duration in seconds, read from `ffmpeg -i` (the bundled ffmpeg has no ffprobe)."""
+    if str(media_path).endswith('.wav'):
+        try:
+            with wave.open(str(media_path)) as w:  # header only, no process spawn
+                return w.getnframes() / w.getframerate()
+        except wave.Error:
+            pass  # not PCM (e.g. pyttsx3 AIFF on macOS); let ffmpeg read it
+    result = subprocess.run([FFMPEG_EXE, '-i', str(media_path)], capture_output=True, text=True)
+    match = re.search(r'Duration: (\d+):(\d+):(\d+(?:\.\d+)?)', result.stderr)
+    if not match:
+        raise RuntimeError(f"Could not read the duration of {media_path}")
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+def _quote(path):
+    # concat list entries are single-quoted; escape quotes in the path itself
+    return "'" + os.path.abspath(path).replace("'", "'\\''") + "'"
+
+def render_timeline(timeline, output_path, work_dir=".", size=None):
+    """
+    Renders [(image_path, audio_path), ...] into one MP4 with a single ffmpeg run.
+
+    Each image is shown for its audio's duration: the images go through the
+    concat demuxer with duration directives and the narration files are
+    concatenated once as the audio track, so there are no per-page segment
+    files and the work grows with output length rather than page count.
+    Images are fitted (letterboxed) to `size`, by default the first image's
+    size rounded to even numbers.
+    """
+    if not timeline:
+        raise ValueError("Empty timeline")
+    if size is None:
+        with Image.open(timeline[0][0]) as first:
+            size = first.size
+    width, height = (size[0] // 2) * 2, (size[1] // 2) * 2
+
+    image_list = os.path.join(work_dir, 'timeline_images.txt')
+    audio_list = os.path.join(work_dir, 'timeline_audio.txt')
+    with open(image_list, 'w', encoding='utf-8') as f:
+        f.write("ffconcat version 1.0\n")
+        for image_path, audio_path in timeline:
+            f.write(f"file {_quote(image_path)}\nduration {probe_duration(audio_path):.3f}\n")
+        # The demuxer ignores the last entry's duration unless the file is repeated
+        f.write(f"file {_quote(timeline[-1][0])}\n")
+    with open(audio_list, 'w', encoding='utf-8') as f:
+        f.write("ffconcat version 1.0\n")
+        for _, audio_path in timeline:
+            f.write(f"file {_quote(audio_path)}\n")
+
+    fit = (f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+           f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2:white,fps={STILL_FPS}")
+    logging.info(f"🎞️ Rendering {len(timeline)} pages in one pass…")
+    subprocess.run([
+        FFMPEG_EXE, '-y',
+        '-f', 'concat', '-safe', '0', '-i', image_list,
+        '-f', 'concat', '-safe', '0', '-i', audio_list,
+        '-map', '0:v', '-map', '1:a',
+        '-vf', fit,
+        *STILL_IMAGE_ARGS,
+        '-shortest',
+        str(output_path)
+    ], check=True)
+    cleanup_files([image_list, audio_list])
+    logging.info(f"✅ Final video saved to {output_path}")
+    return output_path
+
+def generate_video_from_pages(
+    images_folder: str = "images",
+    summary_path: str = "summary.txt",
+    output_path: str = "videos/summary_video.mp4",
+    pages=None,
+    work_dir: str = ".",
+    workers: int = None,
+    mode: str = "segments",
+    segment_store=None,
+    narrator=None
+):
+    # pages: optional in-memory Page objects; they are written to images_folder
+    # only here, because ffmpeg needs a file per still image
+    # workers: pages narrated and encoded at once (default: half the cores, up to 4)
+    # mode: "segments" (one MP4 per page, joined by stream copy) or "timeline"
+    # (one ffmpeg run over all pages, see render_timeline)
+    # segment_store: optional SegmentStore; unchanged pages reuse their stored
+    # segment and skip narration and encoding (segments mode)
+    # narrator: tts.Narrator to use (default: cached offline pyttsx3)
+    narrator = narrator or get_narrator()
+    if mode not in VIDEO_MODES:
+        raise ValueError(f"Unknown video mode: {mode} (expected one of {VIDEO_MODES})")
+    # 1) Load summaries into a dict: { page_num: text }
+    summaries = parse_summaries(summary_path)
 
     # 2) Discover all page images, sorted by the number in their filename
+    if pages is not None:
+        image_files = [Path(page.materialize(images_folder)) for page in pages]
+    else:
+        image_files = Path(images_folder).glob("page_*.png")
     image_files = sorted(
-        Path(images_folder).glob("page_*.png"),
+        image_files,
         key=lambda p: int(re.search(r'page_(\d+)\.png', p.name).group(1))
     )
     if not image_files:
@@ -32,67 +200,67 @@ def generate_video_from_pages(
         return
 
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    segments = []
+    workers = workers or default_encode_workers()
+    threads = max(1, (os.cpu_count() or 1) // workers)
 
-    # 3) One segment per image
-    for img_path in image_files:
+    # 3) One segment per image, several pages at a time. Keys are recorded as
+    # soon as the store pins them so a failing page can't leak the others' pins
+    pinned = []
+
+    def render(img_path):
         page_num = int(re.search(r'page_(\d+)\.png', img_path.name).group(1))
         text = summaries.get(page_num, "")
 
-        audio_path = f"page_{page_num}.mp3"
-        segment_path = f"segment_page_{page_num}.mp4"
+        audio_path = os.path.join(work_dir, f"page_{page_num}.mp3")
+        segment_path = os.path.join(work_dir, f"segment_page_{page_num}.mp4")
+
+        key = None
+        if segment_store is not None and mode == "segments":
+            key = segment_store.key(img_path, text, narrator.voice, SEGMENT_SETTINGS)
+            stored = segment_store.get(key)
+            if stored:
+                pinned.append(key)
+                return stored, None
 
         # a) Generate audio (or a brief silent placeholder)
-        if text:
-            logging.info(f"🔊 Generating audio for page {page_num}…")
-            gTTS(text).save(audio_path)
-        else:
-            # 0.5s of silence so the slide still appears
-            subprocess.run([
-                FFMPEG_EXE, '-y',
-                '-f', 'lavfi', '-i',
-                'anullsrc=channel_layout=stereo:sample_rate=44100',
-                '-t', '0.5',
-                audio_path
-            ], check=True)
+        audio_path = make_page_audio(page_num, text, audio_path, narrator)
 
         # b) Create the video segment
-        cmd = [
-            FFMPEG_EXE, '-y',
-            '-loop', '1',
-            '-i', str(img_path),
-            '-i', audio_path,
-            '-vf', 'scale=trunc(iw/2)*2:trunc(ih/2)*2',
-            '-c:v', 'libx264',
-            '-c:a', 'aac',
-            '-pix_fmt', 'yuv420p',
-            '-shortest',
-            segment_path
-        ]
-        logging.info(f"🔨 Creating segment for page {page_num}")
-        subprocess.run(cmd, check=True)
-        segments.append(segment_path)
-
-    # 4) Write the concat list
-    list_file = 'segments.txt'
-    with open(list_file, 'w', encoding='utf-8') as lf:
-        for seg in segments:
-            lf.write(f"file '{os.path.abspath(seg)}'\n")
+        if mode == "timeline":
+            return None, audio_path
+        encode_segment(img_path, audio_path, segment_path, threads)
+        if key is not None:
+            segment_path = segment_store.put(key, segment_path)
+            pinned.append(key)
+        return segment_path, audio_path
 
-    # 5) Stitch them all together
-    logging.info(f"🔗 Concatenating {len(segments)} segments…")
-    subprocess.run([
-        FFMPEG_EXE, '-y',
-        '-f', 'concat', '-safe', '0',
-        '-i', list_file,
-        '-c', 'copy',
-        output_path
-    ], check=True)
-    logging.info(f"✅ Final video saved to {output_path}")
+    list_file = os.path.join(work_dir, 'segments.txt')
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="encode") as pool:
+            rendered = list(pool.map(render, image_files))  # keeps page order
+
+        if mode == "timeline":
+            audio_files = [audio for _, audio in rendered]
+            render_timeline(list(zip(image_files, audio_files)), output_path, work_dir)
+            cleanup_files(audio_files)
+            return
+        segments = [segment for segment, _ in rendered]
+        audio_files = [audio for _, audio in rendered if audio]
+
+        # 4) Write the concat list and 5) stitch them all together
+        concat_segments(segments, output_path, list_file)
+    finally:
+        if segment_store is not None:
+            segment_store.release(pinned)
+
+    # 6) Cleanup intermediates (stored segments stay for the next run)
+    temporary = segments if segment_store is None else []
+    cleanup_files(temporary + [list_file] + audio_files)
+    if segment_store is not None:
+        segment_store.log_stats()
 
-    # 6) Cleanup intermediates
-    to_remove = segments + [list_file] + [f"page_{n}.mp3" for n in summaries]
-    for p in to_remove:
+def cleanup_files(paths):
+    for p in paths:
         try:
             os.remove(p)
         except OSError:
@@ -0,0 +1,305 @@
+import os
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+
+import fitz  # pymupdf
+
+from vision_rag_summarizer.modules.pdf_to_images import render_pages, FITZ_LOCK
+from vision_rag_summarizer.modules.ocr_extract import extract_page_text
+from vision_rag_summarizer.modules.prompt_builder import build_prompt, chunk_text, DEFAULT_PROMPT_BUDGET
+from vision_rag_summarizer.modules.rag_store import build_vector_store, query_similar_batch
+from vision_rag_summarizer.modules.video_generator import (
+    make_page_audio, encode_segment, concat_segments, render_timeline, cleanup_files,
+    SEGMENT_SETTINGS
+)
+from vision_rag_summarizer.modules.tts import get_narrator
+from vision_rag_summarizer.utils.time_out import wait_with_timeout
+
+# End-of-stream marker passed down the stage queues
+_DONE = object()
+
+# Registry entries process_document uses; entry points prewarm exactly these
+PIPELINE_MODELS = ("tokenizer", "embedder", "caption_queue", "llm_queue")
+
+@dataclass
+class PipelineConfig:
+    dpi: int = 300
+    render_workers: int = 1  # > 1 rasterizes in a process pool
+    extract_workers: int = os.cpu_count() or 1
+    caption_batch_size: int = 8
+    retrieve_workers: int = 2
+    retrieve_batch_size: int = 32  # pages per embedding + top-k call
+    summarize_concurrency: int = 16  # prompts in flight to the LLM batch queue
+    narrate_workers: int = 4
+    tts_engine: str = "pyttsx3"  # offline; "coqui" is offline too, "gtts" needs network (see modules/tts.py)
+    tts_processes: int = None  # offline engines' worker processes (None: tts.default_tts_processes(); 1: in-process)
+    encode_workers: int = 2
+    encode_threads: int = None  # x264 threads per segment (None: the cores split across encode_workers)
+    video_mode: str = "segments"  # or "timeline": one ffmpeg run at the end, no per-page segments
+    queue_size: int = 8  # bound on pages waiting between two stages
+    rag_k: int = 3
+    rag_chunk_tokens: int = 128  # sub-page window size for the RAG store
+    rag_chunk_overlap: int = 32
+    prompt_token_budget: int = DEFAULT_PROMPT_BUDGET
+    llm_timeout: float = 180
+    llm_return_partial: bool = False  # on timeout, keep the partial summary instead of "[Timeout]"
+    lang: str = "eng"
+
+async def _stage(name, fn, inbox, outbox, workers=1, batch_size=1, timings=None):
+    """
+    Runs `workers` consumers of inbox; each awaits fn(item) (or fn(list) when
+    batch_size > 1, taking whatever is already queued up to batch_size) and
+    puts the results on outbox. Sends _DONE downstream once inbox is drained.
+    """
+    async def worker():
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                await inbox.put(_DONE)  # let sibling workers see it too
+                return
+            batch = [item]
+            while batch_size > 1 and len(batch) < batch_size and not inbox.empty():
+                nxt = inbox.get_nowait()
+                if nxt is _DONE:
+                    await inbox.put(_DONE)
+                    break
+                batch.append(nxt)
+
+            start = time.perf_counter()
+            results = await fn(batch) if batch_size > 1 else [await fn(item)]
+            if timings is not None:
+                timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+            if outbox is not None:
+                for result in results:
+                    await outbox.put(result)
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    if outbox is not None:
+        await outbox.put(_DONE)
+
+async def process_document(pdf_path, models, work_dir=".", config=None, cache=None, segment_store=None):
+    """
+    Runs one PDF through rasterize → extract → caption → retrieve → summarize
+    → narrate → encode, with the stages connected by bounded queues.
+
+    Each stage has its own worker count and thread pool, so CPU-heavy stages
+    overlap and a slow stage holds back its producers instead of letting pages
+    pile up in memory. The RAG index needs every page's text, so retrieval
+    starts once extraction has finished; pages are written to disk and their
+    pixel buffers released after captioning, so everything queued behind that
+    barrier is just text and file paths.
+
+    models is a ModelRegistry (see model_registry.build_registry) providing
+    "caption_queue", "llm_queue" and "tokenizer". Each is fetched when its stage first
+    needs it, so models still loading (e.g. from registry.prewarm()) only
+    hold back the stages that use them while rasterization and OCR run.
+
+    With a segment_store (SegmentStore), pages whose image and summary are
+    unchanged since an earlier run reuse their stored segment and skip
+    narration and encoding.
+
+    Returns (summary_path, video_path).
+    """
+    config = config or PipelineConfig()
+    start = time.time()
+    work_dir = Path(work_dir)
+    img_folder = work_dir / "images"
+    summary_file = work_dir / "summary.txt"
+    video_path = work_dir / "videos" / "summary_video.mp4"
+    os.makedirs(video_path.parent, exist_ok=True)
+
+    loop = asyncio.get_running_loop()
+    pools = {
+        name: ThreadPoolExecutor(max_workers=n, thread_name_prefix=name)
+        for name, n in [
+            ("rasterize", 1), ("extract", config.extract_workers), ("caption", 1),
+            ("retrieve", config.retrieve_workers), ("narrate", config.narrate_workers),
+            ("encode", config.encode_workers),
+        ]
+    }
+    encode_threads = config.encode_threads or max(1, (os.cpu_count() or 1) // config.encode_workers)
+    bounded = lambda: asyncio.Queue(maxsize=config.queue_size)
+    q_pages, q_extracted, q_captioned, q_ctx, q_summaries, q_audio = (
+        bounded(), bounded(), asyncio.Queue(), bounded(), bounded(), bounded()
+    )
+    timings = {}
+    entries = []
+    segments = []
+    index_ready = asyncio.Event()
+    doc_id = str(Path(pdf_path).resolve())  # RAG collection for this document
+    # Loading a model (Coqui) or probing the network (gTTS) takes a while; keep it off the event loop
+    narrator = await loop.run_in_executor(
+        None, functools.partial(get_narrator, config.tts_engine, processes=config.tts_processes)
+    )
+    use_rag = False
+    with FITZ_LOCK:
+        doc = fitz.open(pdf_path)
+
+    async def rasterize():
+        pages = render_pages(pdf_path, dpi=config.dpi, workers=config.render_workers)
+        t0 = time.perf_counter()
+        while (page := await loop.run_in_executor(pools["rasterize"], next, pages, None)) is not None:
+            timings["rasterize"] = timings.get("rasterize", 0.0) + time.perf_counter() - t0
+            await q_pages.put(page)
+            t0 = time.perf_counter()
+        await q_pages.put(_DONE)
+
+    async def model(name):
+        # The first get() may block on a load; keep it off the event loop
+        return models.get(name) if models.loaded(name) else await loop.run_in_executor(None, models.get, name)
+
+    async def extract(page):
+        tokenizer = await model("tokenizer")
+        entry = await loop.run_in_executor(
+            pools["extract"], extract_page_text, doc, page.number, page,
+            config.lang, config.dpi, cache
+        )
+        # Tokenizing a long page takes milliseconds; keep it off the event loop
+        entry["chunks"] = await asyncio.to_thread(
+            chunk_text, entry["text"], config.rag_chunk_tokens, config.rag_chunk_overlap, tokenizer
+        )
+        entries.append(entry)
+        return entry
+
+    async def build_index():
+        nonlocal use_rag
+        ordered = sorted(entries, key=lambda e: e["page_number"])
+        use_rag = len(ordered) > 1
+        if use_rag:
+            logging.info("📚 Building RAG store…")
+            await loop.run_in_executor(pools["retrieve"], build_vector_store, ordered, doc_id)
+        index_ready.set()
+
+    async def caption(batch):
+        # Shared queue: pages of other documents in flight batch with these
+        caption_queue = await model("caption_queue")
+        captions = await asyncio.gather(
+            *(asyncio.wrap_future(caption_queue.submit(entry["page"])) for entry in batch)
+        )
+
+        def store():
+            for entry, text in zip(batch, captions):
+                entry["caption"] = text
+                # The encoder needs a file; after that the pixels are no longer needed
+                entry["image_path"] = entry["page"].materialize(str(img_folder))
+                entry["page"].release()
+            return batch
+        return await loop.run_in_executor(pools["caption"], store)
+
+    async def retrieve(batch):
+        await index_ready.wait()
+        chunks = [[] for _ in batch]
+        if use_rag:
+            # A page's own chunk would always rank first; it is already in the prompt
+            chunks = await loop.run_in_executor(
+                pools["retrieve"], query_similar_batch, [e["text"] for e in batch],
+                config.rag_k, doc_id, [e["page_number"] for e in batch]
+            )
+        for entry, rag_chunks in zip(batch, chunks):
+            entry["rag_chunks"] = rag_chunks
+        return batch
+
+    async def summarize(entry):
+        tokenizer, llm_queue = await model("tokenizer"), await model("llm_queue")
+        prompt, prefixes = await asyncio.to_thread(
+            build_prompt, entry["caption"], entry["rag_chunks"], entry["text"], tokenizer,
+            config.prompt_token_budget, return_prefix=True
+        )
+        entry["summary"] = await wait_with_timeout(
+            llm_queue.submit((prompt, prefixes)), timeout=config.llm_timeout,
+            return_partial=config.llm_return_partial
+        )
+        return entry
+
+    async def narrate(entry):
+        n = entry["page_number"]
+        entry["segment_path"] = entry["segment_key"] = None
+        if segment_store is not None and config.video_mode == "segments":
+            def lookup():
+                key = segment_store.key(entry["image_path"], entry["summary"], narrator.voice, SEGMENT_SETTINGS)
+                return key, segment_store.get(key)
+            entry["segment_key"], entry["segment_path"] = await loop.run_in_executor(pools["narrate"], lookup)
+            if entry["segment_path"]:
+                entry["audio_path"] = None
+                return entry
+        entry["audio_path"] = await loop.run_in_executor(
+            pools["narrate"], make_page_audio, n, entry["summary"], str(work_dir / f"page_{n}.mp3"), narrator
+        )
+        return entry
+
+    async def encode(entry):
+        n = entry["page_number"]
+        if config.video_mode == "timeline":
+            segments.append((n, None, entry["audio_path"]))  # rendered in one pass at the end
+            return
+        if entry["segment_path"]:
+            segments.append((n, entry["segment_path"], None))
+            return
+        segment = await loop.run_in_executor(
+            pools["encode"], encode_segment, entry["image_path"], entry["audio_path"],
+            str(work_dir / f"segment_page_{n}.mp4"), encode_threads
+        )
+        if entry["segment_key"]:
+            segment = entry["segment_path"] = await loop.run_in_executor(
+                pools["encode"], segment_store.put, entry["segment_key"], segment
+            )
+        segments.append((n, segment, entry["audio_path"]))
+
+    async def extract_then_index():
+        await _stage("extract", extract, q_pages, q_extracted, config.extract_workers, timings=timings)
+        await build_index()
+
+    tasks = [asyncio.ensure_future(stage) for stage in (
+        rasterize(),
+        extract_then_index(),
+        _stage("caption", caption, q_extracted, q_captioned,
+               batch_size=config.caption_batch_size, timings=timings),
+        _stage("retrieve", retrieve, q_captioned, q_ctx, config.retrieve_workers,
+               batch_size=config.retrieve_batch_size, timings=timings),
+        _stage("summarize", summarize, q_ctx, q_summaries, config.summarize_concurrency, timings=timings),
+        _stage("narrate", narrate, q_summaries, q_audio, config.narrate_workers, timings=timings),
+        _stage("encode", encode, q_audio, None, config.encode_workers, timings=timings),
+    )]
+    try:
+        await asyncio.gather(*tasks)
+
+        entries.sort(key=lambda e: e["page_number"])
+        summary_file.write_text(
+            "".join(f"--- Page {e['page_number']} ---\n{e['summary']}\n" for e in entries),
+            encoding="utf-8"
+        )
+        logging.info(f"✅ Summary written to {summary_file}")
+
+        segments.sort(key=lambda s: s[0])
+        audio_files = [a for _, _, a in segments if a]
+        if config.video_mode == "timeline":
+            images = {e["page_number"]: e["image_path"] for e in entries}
+            render_timeline([(images[n], a) for n, _, a in segments], str(video_path), str(work_dir))
+            cleanup_files(audio_files)
+        else:
+            list_file = str(work_dir / "segments.txt")
+            concat_segments([s for _, s, _ in segments], str(video_path), list_file)
+            # Stored segments stay for the next run
+            temporary = [s for _, s, _ in segments] if segment_store is None else []
+            cleanup_files(temporary + audio_files + [list_file])
+        if segment_store is not None:
+            segment_store.log_stats()
+    finally:
+        if segment_store is not None:
+            # Pinned by get()/put() so eviction couldn't remove them before the concat
+            segment_store.release([e["segment_key"] for e in entries if e.get("segment_path")])
+        # If a stage failed, the others would wait on their queues forever
+        for task in tasks:
+            task.cancel()
+        doc.close()
+        for pool in pools.values():
+            pool.shutdown(wait=False)
+
+    busy = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in timings.items())
+    logging.info(f"⏱️ {len(entries)} pages in {time.time() - start:.1f}s wall (stage busy time: {busy})")
+    return summary_file, video_path
@@ -0,0 +1,162 @@
+import json
+import uuid
+import time
+import asyncio
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from vision_rag_summarizer.modules import rag_store
+from vision_rag_summarizer.pipeline import PIPELINE_MODELS, PipelineConfig, process_document
+
+class JobService:
+    """
+    Keeps the models resident and runs submitted documents through
+    process_document, at most `concurrency` at a time.
+
+    Jobs run on one background event loop, so concurrent documents share the
+    registry's models and LLM batch queue (their prompts batch together).
+    """
+    def __init__(self, models, cache=None, concurrency=1, config=None, jobs_dir="jobs"):
+        self.models = models
+        self.cache = cache
+        self.config = config or PipelineConfig()
+        self.jobs_dir = Path(jobs_dir)
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._loop = asyncio.new_event_loop()
+        self._slots = None
+        self._concurrency = concurrency
+        self._thread = threading.Thread(target=self._run_loop, name="job-loop", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._slots = asyncio.Semaphore(self._concurrency)
+        self._loop.run_forever()
+
+    def submit(self, pdf_path, output_dir=None) -> str:
+        if not Path(pdf_path).is_file():
+            raise FileNotFoundError(f"PDF not found: {pdf_path}")
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            "id": job_id, "status": "queued", "pdf_path": str(pdf_path),
+            "output_dir": str(output_dir or self.jobs_dir / job_id),
+            "submitted": time.time(), "started": None, "finished": None,
+            "summary_path": None, "video_path": None, "error": None,
+        }
+        with self._lock:
+            self.jobs[job_id] = job
+        asyncio.run_coroutine_threadsafe(self._run(job), self._loop)
+        logging.info(f"📥 Job {job_id} queued: {pdf_path}")
+        return job_id
+
+    def _update(self, job, **fields):
+        # status() and list() copy jobs under the lock; change them under it too
+        with self._lock:
+            job.update(fields)
+
+    async def _run(self, job):
+        async with self._slots:
+            self._update(job, status="running", started=time.time())
+            try:
+                summary_file, video_path = await process_document(
+                    job["pdf_path"], self.models, work_dir=job["output_dir"],
+                    config=self.config, cache=self.cache
+                )
+                self._update(job, status="done", summary_path=str(summary_file), video_path=str(video_path))
+            except Exception as e:
+                logging.error(f"❌ Job {job['id']} failed: {e}")
+                self._update(job, status="failed", error=str(e))
+            self._update(job, finished=time.time())
+            logging.info(f"🏁 Job {job['id']} {job['status']} in {job['finished'] - job['started']:.1f}s")
+
+    def status(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list(self):
+        with self._lock:
+            return [dict(job) for job in self.jobs.values()]
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self.models.close()
+
+def _handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                return self._reply(404, {"error": "not found"})
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not isinstance(body, dict):
+                    raise ValueError("expected a JSON object")
+                if not all(isinstance(body.get(k, ""), str) for k in ("pdf_path", "output_dir")):
+                    raise ValueError("pdf_path and output_dir must be strings")
+                job_id = service.submit(body["pdf_path"], body.get("output_dir"))
+            except (KeyError, ValueError) as e:
+                return self._reply(400, {"error": f"bad request: {e}"})
+            except FileNotFoundError as e:
+                return self._reply(404, {"error": str(e)})
+            self._reply(202, {"id": job_id, "status": "queued"})
+
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            if parts == ["jobs"]:
+                return self._reply(200, service.list())
+            if len(parts) == 2 and parts[0] == "jobs":
+                job = service.status(parts[1])
+                return self._reply(200, job) if job else self._reply(404, {"error": "unknown job"})
+            self._reply(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+
+    return Handler
+
+def serve(host="127.0.0.1", port=8765, concurrency=1, rag_backend="chroma"):
+    """
+    Local job API:
+
+    - POST /jobs {"pdf_path": ..., "output_dir": optional} → 202 {"id", "status"}
+    - GET /jobs/<id> → job status, timestamps, output paths or error
+    - GET /jobs → all jobs
+    """
+    from vision_rag_summarizer.main import setup
+
+    cache, models = setup(rag_backend)
+    models.prewarm(*PIPELINE_MODELS)
+    service = JobService(models, cache=cache, concurrency=concurrency)
+    server = ThreadingHTTPServer((host, port), _handler(service))
+    logging.info(f"🚀 Serving jobs on http://{host}:{port} (concurrency {concurrency})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        cache.log_stats()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Warm worker service for PDF → summary video jobs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=1, help="documents processed at once")
+    parser.add_argument("--rag-backend", choices=rag_store.BACKENDS, default="chroma",
+                        help="vector store for page retrieval (numpy: flat in-process index)")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.concurrency, args.rag_backend)
@@ -0,0 +1,97 @@
+import queue
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+from vision_rag_summarizer.utils.time_out import CancellationToken
+
+class BatchQueue:
+    """
+    Groups single requests into batched calls on one worker thread.
+
+    Callers submit() items and get a concurrent.futures.Future per item. The
+    worker waits up to max_wait seconds after the first item for more to
+    arrive, sorts what it collected by sort_key (e.g. prompt length, so each
+    batch needs little padding) and calls batch_fn(items) -> results in chunks
+    of at most max_batch_size.
+
+    With cancellable=True every future carries a CancellationToken as
+    future.cancel_token and the worker calls batch_fn(items, cancel_tokens=...),
+    so one timed-out request can stop its row of a running batch.
+    """
+    def __init__(self, batch_fn, max_batch_size=8, max_wait=0.05, sort_key=None,
+                 buckets=4, cancellable=False, name="batch-queue"):
+        self.batch_fn = batch_fn
+        self.cancellable = cancellable
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.sort_key = sort_key
+        self.buckets = buckets  # collect up to buckets * max_batch_size items per round
+        self._queue = queue.Queue()
+        self._closed = False
+        self._worker = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item) -> Future:
+        if self._closed:
+            raise RuntimeError("BatchQueue is closed")
+        future = Future()
+        future.cancel_token = CancellationToken() if self.cancellable else None
+        self._queue.put((item, future))
+        return future
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join()
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        pending = [first]
+        limit = self.max_batch_size * max(1, self.buckets)
+        deadline = time.monotonic() + self.max_wait
+        while len(pending) < limit:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                nxt = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if nxt is None:
+                self._queue.put(None)  # let the next round see the close marker
+                break
+            pending.append(nxt)
+        return pending
+
+    def _loop(self):
+        while True:
+            pending = self._collect()
+            if pending is None:
+                return
+
+            if self.sort_key is not None:
+                pending.sort(key=lambda p: self.sort_key(p[0]))
+
+            for start in range(0, len(pending), self.max_batch_size):
+                # Requests cancelled while queued (e.g. timed out) are dropped here
+                batch = [(item, f) for item, f in pending[start:start + self.max_batch_size]
+                         if f.set_running_or_notify_cancel()]
+                if not batch:
+                    continue
+                items = [item for item, _ in batch]
+                try:
+                    if self.cancellable:
+                        results = self.batch_fn(items, cancel_tokens=[f.cancel_token for _, f in batch])
+                    else:
+                        results = self.batch_fn(items)
+                except Exception as e:
+                    logging.error(f"❌ Batch of {len(batch)} failed: {e}")
+                    for _, future in batch:
+                        future.set_exception(e)
+                    continue
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
@@ -0,0 +1,26 @@
+import torch
+from transformers import StoppingCriteria, StoppingCriteriaList
+
+class CancelCriteria(StoppingCriteria):
+    """
+    Ends generation for batch rows whose CancellationToken was cancelled.
+
+    Returns one flag per row, so cancelling one prompt of a batch only
+    finishes that row (it is padded from then on) and the others continue.
+    """
+    def __init__(self, tokens):
+        self.tokens = list(tokens)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        done = [token is not None and token.cancelled for token in self.tokens]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+def cancel_criteria(tokens):
+    """StoppingCriteriaList for generate(), or None if no row can be cancelled."""
+    tokens = list(tokens or [])
+    if not any(token is not None for token in tokens):
+        return None
+    return StoppingCriteriaList([CancelCriteria(tokens)])
+
+def was_cancelled(token) -> bool:
+    return token is not None and token.cancelled
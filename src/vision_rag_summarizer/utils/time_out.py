@@ -1,27 +1,89 @@
 
 
 import asyncio
+import functools
 import logging
+import threading
 
-async def run_with_timeout(func, *args, timeout=60):
+class CancellationToken:
+    """
+    Thread-safe flag a blocking call polls to stop early.
+
+    The model wrappers turn it into a transformers StoppingCriteria, so
+    generation ends at the next decode step instead of running to completion.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+async def _after_cancel(afut, timeout, grace, return_partial):
+    # Generation stops at its next step; collect what it produced so far
+    logging.error(f"⏱️ Timeout after {timeout} seconds, cancelling generation")
+    try:
+        partial = await asyncio.wait_for(afut, timeout=grace)
+    except Exception:
+        return "[Timeout]"
+    if return_partial:
+        logging.warning("⚠️ Returning partial output after timeout")
+        return partial
+    return "[Timeout]"
+
+async def run_with_timeout(func, *args, timeout=60, cancellable=False, return_partial=False, grace=10):
     """
     Runs a blocking function with a timeout in an executor.
 
     :param func: Function to run
     :param args: Arguments to pass to the function
     :param timeout: Timeout in seconds
+    :param cancellable: Pass a CancellationToken as func(..., cancel_token=token)
+        and cancel it on timeout, so the executor thread actually stops
+    :param return_partial: With cancellable, return whatever func produced
+        before it stopped instead of the timeout placeholder
+    :param grace: Seconds to wait for a cancelled call to wind down
     :return: Result of the function or timeout placeholder
     """
+    token = CancellationToken() if cancellable else None
+    call = functools.partial(func, *args, cancel_token=token) if token else functools.partial(func, *args)
     try:
         loop = asyncio.get_event_loop()
-        result = await asyncio.wait_for(
-            loop.run_in_executor(None, func, *args),
-            timeout=timeout
-        )
+        afut = loop.run_in_executor(None, call)
+        result = await asyncio.wait_for(asyncio.shield(afut), timeout=timeout)
         return result
     except asyncio.TimeoutError:
-        logging.error(f"⏱️ Timeout after {timeout} seconds")
-        return "[Timeout]"
+        if token is None:
+            logging.error(f"⏱️ Timeout after {timeout} seconds")
+            return "[Timeout]"
+        token.cancel()
+        return await _after_cancel(afut, timeout, grace, return_partial)
     except Exception as e:
         logging.error(f"❌ Exception in run_with_timeout: {e}")
         return "[Error]"
+
+async def wait_with_timeout(future, timeout=60, return_partial=False, grace=10):
+    """
+    Awaits a concurrent.futures.Future (e.g. from BatchQueue.submit) with a timeout.
+
+    On timeout the future is cancelled, so a request still waiting in a queue
+    never reaches the model. If it is already generating, its cancel_token
+    (set by BatchQueue) is cancelled instead and the call stops at the next
+    decode step, optionally returning the partial output.
+    """
+    afut = asyncio.wrap_future(future)
+    try:
+        return await asyncio.wait_for(asyncio.shield(afut), timeout=timeout)
+    except asyncio.TimeoutError:
+        token = getattr(future, "cancel_token", None)
+        if future.cancel() or token is None:
+            logging.error(f"⏱️ Timeout after {timeout} seconds")
+            return "[Timeout]"
+        token.cancel()
+        return await _after_cancel(afut, timeout, grace, return_partial)
+    except Exception as e:
+        logging.error(f"❌ Exception in wait_with_timeout: {e}")
+        return "[Error]"
@@ -0,0 +1,29 @@
+import asyncio
+from pathlib import Path
+
+from vision_rag_summarizer import batch
+from vision_rag_summarizer.batch import _work_dirs
+from vision_rag_summarizer.pipeline import PipelineConfig
+
+def test_work_dirs_are_unique_for_colliding_stems():
+    pdfs = [Path("x/a.pdf"), Path("y/a.pdf"), Path("a_1.pdf"), Path("z/a.pdf")]
+    dirs = _work_dirs(pdfs, "out")
+    assert len(set(dirs)) == len(dirs)
+    assert dirs[0] == Path("out/a")
+    assert dirs[2].name.startswith("a_1")
+
+def test_work_dirs_keep_plain_stems():
+    assert _work_dirs([Path("a.pdf"), Path("b.pdf")], "out") == [Path("out/a"), Path("out/b")]
+
+def test_concurrent_documents_split_the_cores(tmp_path, monkeypatch):
+    seen = []
+
+    async def fake_process_document(pdf, models, work_dir, config, cache=None):
+        seen.append(config)
+        return work_dir / "summary.txt", work_dir / "summary_video.mp4"
+
+    monkeypatch.setattr(batch, "process_document", fake_process_document)
+    monkeypatch.setattr(batch.os, "cpu_count", lambda: 16)
+    config = PipelineConfig(extract_workers=16, narrate_workers=8, encode_workers=2)
+    asyncio.run(batch.process_batch([Path("a.pdf"), Path("b.pdf")], None, tmp_path, max_docs=4, config=config))
+    assert {(c.extract_workers, c.narrate_workers, c.encode_threads) for c in seen} == {(4, 2, 2)}
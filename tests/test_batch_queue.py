@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from vision_rag_summarizer.utils.batch_queue import BatchQueue
+
+def test_requests_within_max_wait_share_a_batch():
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    queue = BatchQueue(batch_fn, max_batch_size=4, max_wait=0.5, buckets=1)
+    try:
+        futures = [queue.submit(i) for i in range(6)]
+        assert [f.result(timeout=5) for f in futures] == [0, 2, 4, 6, 8, 10]
+    finally:
+        queue.close()
+    assert [len(batch) for batch in calls] == [4, 2]
+
+def test_sort_key_orders_each_round():
+    calls = []
+    queue = BatchQueue(lambda items: calls.append(list(items)) or items, max_batch_size=8,
+                       max_wait=0.5, sort_key=len)
+    try:
+        futures = [queue.submit(text) for text in ("ccc", "a", "bb")]
+        assert [f.result(timeout=5) for f in futures] == ["ccc", "a", "bb"]
+    finally:
+        queue.close()
+    assert calls == [["a", "bb", "ccc"]]
+
+def test_cancelled_while_queued_is_dropped():
+    started, release = threading.Event(), threading.Event()
+    seen = []
+
+    def batch_fn(items):
+        if items == ["block"]:
+            started.set()
+            release.wait(5)
+        seen.extend(items)
+        return items
+
+    queue = BatchQueue(batch_fn, max_batch_size=1, max_wait=0.01)
+    try:
+        blocker = queue.submit("block")
+        assert started.wait(5)
+        dropped, kept = queue.submit("dropped"), queue.submit("kept")
+        assert dropped.cancel()
+        release.set()
+        assert kept.result(timeout=5) == "kept"
+        assert blocker.result(timeout=5) == "block"
+    finally:
+        queue.close()
+    assert "dropped" not in seen
+
+def test_cancel_token_reaches_running_batch():
+    tokens = []
+
+    def batch_fn(items, cancel_tokens=None):
+        tokens.extend(cancel_tokens)
+        return ["partial" if t.cancelled else "done" for t in cancel_tokens]
+
+    queue = BatchQueue(batch_fn, max_wait=0.2, cancellable=True)
+    try:
+        first, second = queue.submit("a"), queue.submit("b")
+        first.cancel_token.cancel()
+        assert (first.result(timeout=5), second.result(timeout=5)) == ("partial", "done")
+    finally:
+        queue.close()
+    assert tokens == [first.cancel_token, second.cancel_token]
+
+def test_batch_failure_fails_its_futures():
+    def batch_fn(items):
+        raise ValueError("boom")
+
+    queue = BatchQueue(batch_fn, max_wait=0.01)
+    try:
+        with pytest.raises(ValueError):
+            queue.submit(1).result(timeout=5)
+    finally:
+        queue.close()
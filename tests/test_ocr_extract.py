@@ -0,0 +1,52 @@
+import io
+
+import fitz
+import pytest
+from PIL import Image, ImageDraw
+
+from vision_rag_summarizer.modules import ocr_extract
+
+def _digital_pdf_with_figure():
+    # Born-digital page: a real text layer plus an embedded raster figure
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    page.insert_text((72, 72), "Quarterly report with a native text layer on this page.", fontsize=12)
+    figure = Image.new("RGB", (400, 200), "white")
+    ImageDraw.Draw(figure).text((20, 80), "TEXT INSIDE FIGURE", fill="black")
+    buffer = io.BytesIO()
+    figure.save(buffer, format="PNG")
+    page.insert_image(fitz.Rect(72, 200, 472, 400), stream=buffer.getvalue())
+    return doc
+
+def test_native_entry_finds_embedded_image_regions():
+    doc = _digital_pdf_with_figure()
+    entry, rects = ocr_extract._native_entry(doc.load_page(0), 1)
+
+    assert entry["method"] == "native"
+    assert "Quarterly report" in entry["blocks"][0]["text"]
+    assert len(rects) == 1
+    assert rects[0] == fitz.Rect(72, 200, 472, 400)
+
+def test_extract_page_text_ocrs_figures_on_digital_pages(monkeypatch):
+    seen = []
+
+    def fake_tesseract(image, lang="eng"):
+        seen.append(image.size)
+        return "TEXT INSIDE FIGURE"
+
+    monkeypatch.setattr(ocr_extract.pytesseract, "image_to_string", fake_tesseract)
+    doc = _digital_pdf_with_figure()
+    entry = ocr_extract.extract_page_text(doc, 1, dpi=72)
+
+    assert entry["method"] == "native+ocr"
+    assert seen == [(400, 200)]
+    assert [b["source"] for b in entry["blocks"]] == ["native", "ocr"]
+    assert "TEXT INSIDE FIGURE" in entry["text"]
+
+@pytest.mark.parametrize("text, usable", [
+    ("This page has a perfectly normal text layer.", True),
+    ("short", False),
+    ("��������������������", False),
+])
+def test_is_usable_text(text, usable):
+    assert ocr_extract._is_usable_text(text) is usable
@@ -0,0 +1,20 @@
+import numpy as np
+from PIL import Image
+
+from vision_rag_summarizer.modules.page import Page, prepare_image
+
+def _page(value, width=1200, height=900):
+    samples = np.full((height, width, 3), value, dtype=np.uint8).tobytes()
+    return Page(number=1, width=width, height=height, samples=samples)
+
+def test_prepare_image_accepts_pages_paths_and_images(tmp_path):
+    path = tmp_path / "page.png"
+    _page(40).to_image().save(path)
+    for source in (_page(40), str(path), Image.open(path)):
+        image = prepare_image(source)
+        assert image.mode == "RGB"
+        assert image.size == (768, 576)
+    assert prepare_image(_page(40), max_size=1024).size == (1024, 768)
+
+def test_prepare_image_skips_blank_pages():
+    assert prepare_image(_page(255)) is None
@@ -0,0 +1,28 @@
+from vision_rag_summarizer.modules.prompt_builder import PROMPT_HEADER, build_prompt, count_tokens
+
+PAGE_TEXT = " ".join(f"word{i}" for i in range(2000))
+RAG_CHUNKS = [" ".join(f"chunk{j}w{i}" for i in range(60)) for j in range(10)]
+
+def test_build_prompt_stays_within_budget():
+    for budget in (128, 256, 1024):
+        prompt = build_prompt("a bar chart", RAG_CHUNKS, PAGE_TEXT, budget=budget)
+        assert count_tokens(prompt) <= budget
+
+def test_build_prompt_keeps_short_inputs_whole():
+    prompt = build_prompt("a bar chart", ["retrieved fact"], "short page text", budget=1024)
+    assert "a bar chart" in prompt
+    assert "retrieved fact" in prompt
+    assert "short page text" in prompt
+
+def test_build_prompt_returns_nested_prefixes():
+    prompt, prefixes = build_prompt("a bar chart", ["retrieved fact"], "page text", return_prefix=True)
+    assert prefixes[0] == PROMPT_HEADER
+    assert len(prefixes) == 2 and "retrieved fact" in prefixes[1]
+    for shorter, longer in zip(prefixes, prefixes[1:]):
+        assert longer.startswith(shorter)
+    assert prompt.startswith(prefixes[-1])
+
+def test_build_prompt_without_rag_shares_only_the_header():
+    prompt, prefixes = build_prompt("a bar chart", [], "page text", return_prefix=True)
+    assert prefixes == (PROMPT_HEADER,)
+    assert prompt.startswith(PROMPT_HEADER)
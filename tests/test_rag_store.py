@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from vision_rag_summarizer.modules import rag_store
+
+@pytest.fixture
+def flat_store(monkeypatch):
+    embedded = []
+
+    def fake_embed(texts):
+        embedded.extend(texts)
+        rows = np.array([[len(t), sum(map(ord, t)) % 97, 1.0] for t in texts], dtype=np.float32)
+        return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+    monkeypatch.setattr(rag_store, "_embed", fake_embed)
+    rag_store.configure(backend="numpy")
+    yield embedded
+    rag_store.configure()
+
+def _pages(*texts):
+    return [{"page_number": i, "text": text} for i, text in enumerate(texts, start=1)]
+
+def test_unchanged_document_embeds_nothing(flat_store):
+    rag_store.build_vector_store(_pages("alpha", "beta", "gamma"), doc_id="doc")
+    flat_store.clear()
+    rag_store.build_vector_store(_pages("alpha", "beta", "gamma"), doc_id="doc")
+    assert flat_store == []
+
+def test_shifted_pages_reuse_embeddings_by_content(flat_store):
+    rag_store.build_vector_store(_pages("alpha", "beta", "gamma"), doc_id="doc")
+    flat_store.clear()
+    # A page inserted at the front moves every other page down by one
+    rag_store.build_vector_store(_pages("new cover", "alpha", "beta", "gamma"), doc_id="doc")
+    assert flat_store == ["new cover"]
+    index = rag_store._flat_index("doc")
+    assert index.texts == ["new cover", "alpha", "beta", "gamma"]
+    assert index.pages.tolist() == [1, 2, 3, 4]
+
+def _index():
+    # Four unit vectors at increasing angles from the x axis
+    angles = np.radians([0, 20, 40, 90])
+    matrix = np.stack([np.cos(angles), np.sin(angles)], axis=1).astype(np.float32)
+    return rag_store.FlatIndex(["c0", "c1", "c2", "c3"], ["t0", "t1", "t2", "t3"], [1, 2, 2, 3], matrix)
+
+def test_flat_index_top_k_in_score_order():
+    queries = np.array([[1, 0], [0, 1]], dtype=np.float32)
+    assert _index().search(queries, k=2) == [["t0", "t1"], ["t3", "t2"]]
+
+def test_flat_index_excludes_query_pages():
+    queries = np.array([[1, 0], [1, 0]], dtype=np.float32)
+    results = _index().search(queries, k=2, exclude_pages=[1, 2])
+    assert results == [["t1", "t2"], ["t0", "t3"]]
+
+def test_flat_index_returns_fewer_than_k_when_pages_are_excluded():
+    index = rag_store.FlatIndex(["c0", "c1"], ["t0", "t1"], [1, 1], np.eye(2, dtype=np.float32))
+    assert index.search(np.eye(2, dtype=np.float32), k=3, exclude_pages=[1, 2]) == [[], ["t1", "t0"]]
+    assert rag_store.FlatIndex().search(np.eye(2, dtype=np.float32)) == [[], []]
+
+def test_flat_index_save_and_load(tmp_path):
+    _index().save(tmp_path)
+    loaded = rag_store.FlatIndex.load(tmp_path)
+    assert loaded.ids == ["c0", "c1", "c2", "c3"]
+    assert loaded.pages.tolist() == [1, 2, 2, 3]
+    assert loaded.search(np.array([[1, 0]], dtype=np.float32), k=1) == [["t0"]]
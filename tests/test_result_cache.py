@@ -0,0 +1,42 @@
+import itertools
+
+import pytest
+
+from vision_rag_summarizer.modules import result_cache
+from vision_rag_summarizer.modules.result_cache import ResultCache, make_key
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Distinct, increasing access times even for back-to-back calls
+    ticks = itertools.count(1)
+    monkeypatch.setattr(result_cache.time, "time", lambda: float(next(ticks)))
+
+def test_get_put_and_persistence(tmp_path):
+    path = str(tmp_path / "results.sqlite")
+    cache = ResultCache(path)
+    assert cache.get("k") is None
+    cache.put("k", "value")
+    assert cache.get("k") == "value"
+    cache.close()
+    assert ResultCache(path).get("k") == "value"
+
+def test_evicts_least_recently_used_first(tmp_path, clock):
+    cache = ResultCache(str(tmp_path / "results.sqlite"), max_bytes=30)
+    cache.put("a", "x" * 10)
+    cache.put("b", "x" * 10)
+    cache.put("c", "x" * 10)
+    assert cache.get("a") is not None  # a is now more recent than b
+    cache.put("d", "x" * 10)
+    assert cache.get("b") is None
+    assert all(cache.get(k) is not None for k in ("a", "c", "d"))
+    assert cache.stats()["bytes"] == 30
+
+def test_replacing_a_value_updates_the_total(tmp_path):
+    cache = ResultCache(str(tmp_path / "results.sqlite"))
+    cache.put("k", "x" * 10)
+    cache.put("k", "x" * 4)
+    assert cache.stats()["bytes"] == 4
+
+def test_make_key_separates_parts():
+    assert make_key("ab", "c") != make_key("a", "bc")
+    assert make_key("a", 1) == make_key("a", "1")
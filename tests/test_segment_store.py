@@ -0,0 +1,44 @@
+from PIL import Image
+
+from vision_rag_summarizer.modules.segment_store import SegmentStore
+
+SETTINGS = ("libx264", "stillimage", 1)
+
+def _image(tmp_path, name, color):
+    path = tmp_path / name
+    Image.new("RGB", (8, 8), color).save(path)
+    return path
+
+def _segment(tmp_path, name, size):
+    path = tmp_path / name
+    path.write_bytes(b"\0" * size)
+    return path
+
+def test_key_changes_only_with_its_inputs(tmp_path):
+    store = SegmentStore(str(tmp_path / "store"))
+    red, blue = _image(tmp_path, "red.png", "red"), _image(tmp_path, "blue.png", "blue")
+    key = store.key(red, "summary", "voice", SETTINGS)
+    assert key == store.key(_image(tmp_path, "red_copy.png", "red"), "summary", "voice", SETTINGS)
+    assert key != store.key(blue, "summary", "voice", SETTINGS)
+    assert key != store.key(red, "edited summary", "voice", SETTINGS)
+    assert key != store.key(red, "summary", "other voice", SETTINGS)
+    assert key != store.key(red, "summary", "voice", ("libx264", "stillimage", 2))
+
+def test_get_after_put_and_across_instances(tmp_path):
+    store = SegmentStore(str(tmp_path / "store"))
+    assert store.get("k1") is None
+    stored = store.put("k1", _segment(tmp_path, "seg.mp4", 10))
+    assert store.get("k1") == stored
+    assert SegmentStore(str(tmp_path / "store")).get("k1") == stored
+    assert (store.hits, store.misses) == (1, 1)
+
+def test_pinned_segments_survive_eviction_until_released(tmp_path):
+    store = SegmentStore(str(tmp_path / "store"), max_bytes=150)
+    for i in range(3):
+        store.put(f"k{i}", _segment(tmp_path, f"seg{i}.mp4", 100))
+    # All three belong to the current run, so none is evicted yet
+    assert all(store.path(f"k{i}").exists() for i in range(3))
+    store.release(["k0", "k1", "k2"])
+    assert not store.path("k0").exists() and not store.path("k1").exists()
+    assert store.path("k2").exists()
+    assert store._total == 100
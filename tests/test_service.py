@@ -0,0 +1,45 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from vision_rag_summarizer.service import _handler
+
+class FakeService:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, pdf_path, output_dir=None):
+        self.submitted.append((pdf_path, output_dir))
+        return "job1"
+
+@pytest.fixture
+def server():
+    service = FakeService()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _handler(service))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", service
+    httpd.shutdown()
+    httpd.server_close()
+
+def _post(url, body):
+    request = urllib.request.Request(f"{url}/jobs", data=json.dumps(body).encode(), method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+@pytest.mark.parametrize("body", [[], "doc.pdf", {}, {"pdf_path": 3}, {"pdf_path": "a.pdf", "output_dir": []}])
+def test_malformed_job_bodies_get_400(server, body):
+    url, service = server
+    assert _post(url, body) == 400
+    assert service.submitted == []
+
+def test_valid_job_is_accepted(server):
+    url, service = server
+    assert _post(url, {"pdf_path": "a.pdf"}) == 202
+    assert service.submitted == [("a.pdf", None)]
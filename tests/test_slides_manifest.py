@@ -0,0 +1,24 @@
+from vision_rag_summarizer.modules.slides_manifest import _font, frame_counts, wrap_line
+
+def test_wrap_line_fits_width_and_keeps_words():
+    line = "the quick brown fox jumps over the lazy dog " * 4
+    parts = wrap_line(line, None, 24, 120)
+    font = _font(None, 24)
+    assert len(parts) > 1
+    assert " ".join(parts).split() == line.split()
+    assert all(font.getlength(part) <= 120 or " " not in part for part in parts)
+
+def test_wrap_line_keeps_short_and_long_words_whole():
+    assert wrap_line("short", None, 24, 600) == ("short",)
+    assert wrap_line("a" * 200, None, 24, 50) == ("a" * 200,)
+
+def test_frame_counts_do_not_drift():
+    durations = [1.3] * 10
+    counts = frame_counts(durations, fps=2)
+    assert sum(counts) == round(sum(durations) * 2)
+
+def test_frame_counts_carry_minimum_frame_forward():
+    # Each short clip still shows, and the extra frames come out of the long one
+    counts = frame_counts([0.1, 0.1, 0.1, 3.0], fps=2)
+    assert counts[:3] == [1, 1, 1]
+    assert sum(counts) == round(3.3 * 2)
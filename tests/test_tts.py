@@ -0,0 +1,67 @@
+import os
+import threading
+
+from vision_rag_summarizer.modules import tts
+
+class FakeEngine:
+    extension = "wav"
+    sample_rate = 22050
+    thread_safe = True
+    voice = "fake"
+
+    def __init__(self):
+        self.calls = 0
+
+    def load(self):
+        pass
+
+    def synthesize(self, text, path):
+        self.calls += 1
+        with open(path, "wb") as f:
+            f.write(b"x" * 100)
+
+def _narrator(monkeypatch, tmp_path, **options):
+    monkeypatch.setitem(tts.ENGINES, "fake", FakeEngine)
+    return tts.Narrator("fake", cache_dir=str(tmp_path / "cache"), **options)
+
+def test_narrator_reuses_cached_audio(monkeypatch, tmp_path):
+    narrator = _narrator(monkeypatch, tmp_path)
+    first = narrator.synthesize("hello", tmp_path / "a")
+    second = narrator.synthesize("hello", tmp_path / "b")
+    assert first.endswith("a.wav") and second.endswith("b.wav")
+    assert narrator.engine.calls == 1
+    assert (narrator.hits, narrator.misses) == (1, 1)
+
+def test_narrator_cache_is_bounded(monkeypatch, tmp_path):
+    narrator = _narrator(monkeypatch, tmp_path, max_bytes=250)
+    for i in range(5):
+        narrator.synthesize(f"sentence {i}", tmp_path / f"out{i}")
+    assert len(os.listdir(tmp_path / "cache")) == 2
+    assert narrator._total == 200
+    # The most recent narration is still cached
+    narrator.synthesize("sentence 4", tmp_path / "again")
+    assert narrator.engine.calls == 5
+
+class ThreadBoundEngine(FakeEngine):
+    thread_safe = False
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def load(self):
+        self.threads.add(threading.get_ident())
+
+    def synthesize(self, text, path):
+        self.threads.add(threading.get_ident())
+        super().synthesize(text, path)
+
+def test_thread_bound_engine_is_driven_from_one_thread(monkeypatch, tmp_path):
+    monkeypatch.setitem(tts.ENGINES, "bound", ThreadBoundEngine)
+    narrator = tts.Narrator("bound", cache_dir=str(tmp_path / "cache"), processes=1)
+    try:
+        narrator.synthesize_many([(f"text {i}", tmp_path / f"out{i}") for i in range(8)], workers=4)
+    finally:
+        narrator.close()
+    assert len(narrator.engine.threads) == 1
+    assert threading.get_ident() not in narrator.engine.threads
@@ -0,0 +1,71 @@
+import subprocess
+import wave
+from pathlib import Path
+
+import pytest
+
+from vision_rag_summarizer.modules import video_generator
+from vision_rag_summarizer.modules.video_generator import probe_duration
+
+def _write_wav(path, seconds, rate=22050):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b"\0\0" * int(seconds * rate))
+    return path
+
+def _fake_ffmpeg(monkeypatch, stderr):
+    calls = []
+
+    def run(cmd, **kwargs):
+        calls.append(cmd)
+        return subprocess.CompletedProcess(cmd, 1, stdout="", stderr=stderr)
+
+    monkeypatch.setattr(video_generator.subprocess, "run", run)
+    return calls
+
+def test_probe_duration_reads_wav_header_without_ffmpeg(tmp_path, monkeypatch):
+    calls = _fake_ffmpeg(monkeypatch, "")
+    assert probe_duration(_write_wav(tmp_path / "a.wav", 1.5)) == pytest.approx(1.5)
+    assert calls == []
+
+def test_probe_duration_falls_back_to_ffmpeg_for_non_pcm_wav(tmp_path, monkeypatch):
+    calls = _fake_ffmpeg(monkeypatch, "  Duration: 00:01:02.50, start: 0.000000")
+    path = tmp_path / "aiff.wav"
+    path.write_bytes(b"FORM\0\0\0\0AIFF")
+    assert probe_duration(path) == pytest.approx(62.5)
+    assert len(calls) == 1
+
+def test_probe_duration_raises_without_duration(tmp_path, monkeypatch):
+    _fake_ffmpeg(monkeypatch, "Invalid data found when processing input")
+    with pytest.raises(RuntimeError):
+        probe_duration(tmp_path / "broken.mp3")
+
+def test_failed_page_releases_the_other_pages_pins(tmp_path, monkeypatch):
+    from PIL import Image
+
+    from vision_rag_summarizer.modules.segment_store import SegmentStore
+
+    images = tmp_path / "images"
+    images.mkdir()
+    for n in (1, 2, 3):
+        Image.new("RGB", (8, 8), (n, 0, 0)).save(images / f"page_{n}.png")
+    summary = tmp_path / "summary.txt"
+    summary.write_text("")
+
+    def encode(img_path, audio_path, segment_path, threads=0):
+        if img_path.name == "page_2.png":
+            raise RuntimeError("ffmpeg failed")
+        Path(segment_path).write_bytes(b"\0" * 10)
+
+    monkeypatch.setattr(video_generator, "make_page_audio", lambda n, text, path, narrator: path)
+    monkeypatch.setattr(video_generator, "encode_segment", encode)
+    store = SegmentStore(str(tmp_path / "store"))
+    narrator = type("Narrator", (), {"voice": "fake"})()
+    with pytest.raises(RuntimeError):
+        video_generator.generate_video_from_pages(
+            str(images), str(summary), str(tmp_path / "out.mp4"), work_dir=str(tmp_path),
+            workers=1, segment_store=store, narrator=narrator,
+        )
+    assert not store._pinned